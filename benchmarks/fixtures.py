@@ -0,0 +1,67 @@
+# benchmarks/fixtures.py
+#
+# Dados sintéticos e determinísticos para o servidor de teste: mesmo seed,
+# mesmos mangás, capítulos e imagens em toda execução. O id de capítulo
+# carrega o número de páginas ("m0001-c12-p20"), então o benchmark pode
+# pedir capítulos de qualquer tamanho sem combinar nada com o servidor.
+
+import random
+import re
+
+WORDS = [
+    "ataque", "titas", "solo", "leveling", "torre", "deus", "espada", "lua",
+    "dragao", "reino", "sombra", "heroi", "vila", "mago", "ultimo", "jogador",
+    "rei", "demonio", "academia", "cacador", "noite", "sangue", "coroa", "vento",
+]
+
+DEFAULT_PAGES = 20
+
+_PAGES = re.compile(r"-p(\d+)$")
+
+
+def fake_jpeg(size, rng):
+    # cabeçalho JPEG + bytes aleatórios: não comprime, como uma página real
+    header = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+    return header + rng.randbytes(max(0, size - len(header)))
+
+
+class FixtureSet:
+    def __init__(self, mangas=500, chapters=120, image_size=200_000, seed=42):
+        rng = random.Random(seed)
+
+        self.mangas = [
+            {
+                "id": f"m{i:04d}",
+                "title": " ".join(rng.sample(WORDS, 3)).title(),
+                "synopsis": " ".join(rng.sample(WORDS, 8)),
+            }
+            for i in range(mangas)
+        ]
+        self.by_id = {manga["id"]: manga for manga in self.mangas}
+        self.chapter_count = chapters
+        self.image = fake_jpeg(image_size, rng)
+
+    # ================= CONSULTAS =================
+    def search(self, query, limit=20, offset=0):
+        q = query.casefold().strip()
+        matches = [
+            manga for manga in self.mangas
+            if q in manga["title"].casefold() or q in manga["synopsis"]
+        ]
+        return matches[offset:offset + limit]
+
+    def manga(self, manga_id):
+        return self.by_id.get(manga_id) or {"id": manga_id, "title": f"Manga {manga_id}", "synopsis": ""}
+
+    def chapters(self, manga_id):
+        return [
+            {"id": f"{manga_id}-c{n}-p{DEFAULT_PAGES}", "number": n}
+            for n in range(1, self.chapter_count + 1)
+        ]
+
+    def page_count(self, chapter_id):
+        match = _PAGES.search(chapter_id)
+        return int(match.group(1)) if match else DEFAULT_PAGES
+
+    def image_paths(self, chapter_id):
+        return [f"{chapter_id}/{i:03d}.jpg" for i in range(self.page_count(chapter_id))]
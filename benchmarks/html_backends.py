@@ -0,0 +1,74 @@
+# benchmarks/html_backends.py
+#
+# Compara os backends de HTML (selectolax, lxml, bs4) nos extratores do
+# MangaLivreBlog.
+#
+#   python -m benchmarks.html_backends                    # página sintética
+#   python -m benchmarks.html_backends salvas/*.html      # páginas salvas
+#
+# Páginas salvas são classificadas pelo conteúdo: lista de capítulos,
+# página de leitura ou resultado de busca.
+
+import statistics
+import sys
+import time
+
+from sources.mangalivreblog import MangaLivreBlogSource
+from utils.html import BACKENDS, parse
+
+REPEAT = 20
+
+
+def synthetic_chapters_page(count=1000):
+    items = "".join(
+        f'<li class="chapter-item"><a class="chapter-link" href="/cap/{i}">'
+        f'<span class="chapter-number">Capítulo {i}</span></a>'
+        f'<span class="chapter-date">01/01/2024</span></li>'
+        for i in range(count)
+    )
+    return (
+        "<html><body><h1 class='manga-title'>Manga</h1>"
+        f"<ul class='chapters-list'>{items}</ul></body></html>"
+    )
+
+
+def extractor_for(html):
+    source = MangaLivreBlogSource()
+    if "chapters-list" in html:
+        return "chapters", source._parse_chapters
+    if "chapter-image-container" in html:
+        return "pages", source._parse_pages
+    return "search", source._parse_search
+
+
+def bench(html, extractor, backend):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        extractor(parse(html, backend))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(paths):
+    if paths:
+        pages = [(path, open(path, encoding="utf-8").read()) for path in paths]
+    else:
+        pages = [("sintética (1000 capítulos)", synthetic_chapters_page())]
+
+    if not BACKENDS:
+        print("Nenhum backend HTML instalado")
+        return
+
+    for name, html in pages:
+        kind, extractor = extractor_for(html)
+        print(f"{name} [{kind}, {len(html) / 1024:.0f} KB]")
+
+        results = {backend: bench(html, extractor, backend) for backend in BACKENDS}
+        slowest = max(results.values())
+        for backend, seconds in sorted(results.items(), key=lambda item: item[1]):
+            print(f"  {backend:<11} {seconds * 1000:8.2f} ms  {slowest / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,404 @@
+# benchmarks/mock_server.py
+#
+# Servidor local que imita os endpoints das quatro fontes (ToonBr,
+# MangaFlix, MangaLivreBlog e Wolftoon) com os dados de benchmarks/fixtures.
+# Cada host real vira um prefixo de caminho:
+#
+#   https://api.toonbr.com/api/manga  ->  http://127.0.0.1:8765/api.toonbr.com/api/manga
+#
+# Latência, banda e erros são injetados por um middleware e podem ser
+# trocados em execução com POST /_config. Com --recorded DIR, respostas
+# gravadas em DIR/<host>/<caminho> têm prioridade sobre as sintéticas.
+#
+#   python -m benchmarks.mock_server --port 8765 --latency 80 --error-rate 0.02
+
+import argparse
+import asyncio
+import os
+import random
+import re
+from html import escape
+
+from aiohttp import web
+
+from benchmarks.fixtures import FixtureSet
+
+
+class Faults:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, bandwidth=0, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bandwidth = bandwidth  # bytes/s por resposta, 0 = sem limite
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    def update(self, values):
+        for key in ("latency_ms", "jitter_ms", "bandwidth", "error_rate"):
+            if key in values:
+                setattr(self, key, type(getattr(self, key))(values[key]))
+
+    def delay(self):
+        jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def should_fail(self):
+        return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+    def as_dict(self):
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "bandwidth": self.bandwidth,
+            "error_rate": self.error_rate,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+# ==========================================================
+# MIDDLEWARE
+# ==========================================================
+
+@web.middleware
+async def inject_faults(request, handler):
+    if request.path.startswith("/_"):
+        return await handler(request)
+
+    faults = request.app["faults"]
+    faults.requests += 1
+
+    delay = faults.delay()
+    if delay:
+        await asyncio.sleep(delay)
+
+    if faults.should_fail():
+        faults.errors += 1
+        return web.Response(status=503, text="erro injetado")
+
+    response = recorded_response(request) or await handler(request)
+
+    if faults.bandwidth and isinstance(response, web.Response) and response.body:
+        return await throttle(request, response, faults.bandwidth)
+    return response
+
+
+async def throttle(request, response, bandwidth):
+    body = response.body
+    stream = web.StreamResponse(
+        status=response.status,
+        headers={"Content-Type": response.headers.get("Content-Type", "application/octet-stream")},
+    )
+    stream.content_length = len(body)
+    await stream.prepare(request)
+
+    chunk_size = max(1024, bandwidth // 20)
+    for i in range(0, len(body), chunk_size):
+        chunk = body[i:i + chunk_size]
+        await stream.write(chunk)
+        await asyncio.sleep(len(chunk) / bandwidth)
+
+    await stream.write_eof()
+    return stream
+
+
+def recorded_response(request):
+    root = request.app["recorded"]
+    if not root:
+        return None
+
+    path = os.path.normpath(os.path.join(root, request.path.lstrip("/")))
+    if not path.startswith(os.path.abspath(root) + os.sep):
+        return None
+    if os.path.isdir(path):
+        path = os.path.join(path, "index")
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, "rb") as f:
+        body = f.read()
+
+    head = body.lstrip()[:1]
+    if head in (b"{", b"["):
+        content_type = "application/json"
+    elif head == b"<":
+        content_type = "text/html"
+    else:
+        content_type = "application/octet-stream"
+    return web.Response(body=body, content_type=content_type)
+
+
+# ==========================================================
+# HANDLERS
+# ==========================================================
+
+def origin(request):
+    return str(request.url.origin())
+
+
+def query_int(request, name, default):
+    try:
+        return int(request.query.get(name, default))
+    except ValueError:
+        return default
+
+
+async def image(request):
+    return web.Response(body=request.app["fixtures"].image, content_type="image/jpeg")
+
+
+# ----- ToonBr -----
+async def toonbr_list(request):
+    fixtures = request.app["fixtures"]
+    limit = query_int(request, "limit", 20)
+    page = query_int(request, "page", 1)
+    search = request.query.get("search")
+
+    if search:
+        items = fixtures.search(search, limit)
+    else:
+        items = fixtures.mangas[(page - 1) * limit:page * limit]
+
+    return web.json_response({"data": [{"title": m["title"], "slug": m["id"]} for m in items]})
+
+
+async def toonbr_manga(request):
+    fixtures = request.app["fixtures"]
+    manga = fixtures.manga(request.match_info["slug"])
+    return web.json_response({
+        "title": manga["title"],
+        "chapters": [
+            {"id": ch["id"], "name": f"Capítulo {ch['number']}", "chapterNumber": ch["number"]}
+            for ch in fixtures.chapters(manga["id"])
+        ],
+    })
+
+
+async def toonbr_chapter(request):
+    fixtures = request.app["fixtures"]
+    paths = fixtures.image_paths(request.match_info["chapter_id"])
+    # o ToonBr devolve caminhos relativos ao CDN
+    return web.json_response({"pages": [{"imageUrl": f"/{path}"} for path in paths]})
+
+
+# ----- MangaFlix -----
+async def mangaflix_search(request):
+    items = request.app["fixtures"].search(request.query.get("query", ""))
+    return web.json_response({"data": [{"_id": m["id"], "name": m["title"]} for m in items]})
+
+
+async def mangaflix_manga(request):
+    fixtures = request.app["fixtures"]
+    manga = fixtures.manga(request.match_info["manga_id"])
+    return web.json_response({"data": {
+        "name": manga["title"],
+        "chapters": [{"_id": ch["id"], "number": ch["number"]} for ch in fixtures.chapters(manga["id"])],
+    }})
+
+
+async def mangaflix_chapter(request):
+    fixtures = request.app["fixtures"]
+    base = origin(request)
+    paths = fixtures.image_paths(request.match_info["chapter_id"])
+    return web.json_response({"data": {
+        "images": [{"default_url": f"{base}/cdn/{path}"} for path in paths],
+    }})
+
+
+# ----- MangaLivreBlog -----
+def html_page(body):
+    return web.Response(text=f"<!DOCTYPE html><html><body>{body}</body></html>", content_type="text/html")
+
+
+async def mangalivre_search(request):
+    base = f"{origin(request)}/mangalivre.blog"
+    items = request.app["fixtures"].search(request.query.get("s", ""))
+    cards = "".join(
+        f'<div class="manga-card"><a href="{base}/manga/{m["id"]}">'
+        f'<img src="{origin(request)}/cdn/capa.jpg"><h3>{escape(m["title"])}</h3></a></div>'
+        for m in items
+    )
+    return html_page(f'<div class="search-results">{cards}</div>')
+
+
+async def mangalivre_manga(request):
+    fixtures = request.app["fixtures"]
+    base = f"{origin(request)}/mangalivre.blog"
+    manga = fixtures.manga(request.match_info["manga_id"])
+    items = "".join(
+        f'<li class="chapter-item"><a class="chapter-link" href="{base}/capitulo/{ch["id"]}">'
+        f'<span class="chapter-number">Capítulo {ch["number"]}</span></a>'
+        f'<span class="chapter-date">01/01/2024</span></li>'
+        for ch in reversed(fixtures.chapters(manga["id"]))
+    )
+    return html_page(
+        f'<h1 class="manga-title">{escape(manga["title"])}</h1>'
+        f'<div class="manga-synopsis">{escape(manga["synopsis"])}</div>'
+        f'<ul class="chapters-list">{items}</ul>'
+    )
+
+
+async def mangalivre_chapter(request):
+    fixtures = request.app["fixtures"]
+    base = origin(request)
+    images = "".join(
+        f'<div class="chapter-image-container"><img src="{base}/cdn/{path}"></div>'
+        for path in fixtures.image_paths(request.match_info["chapter_id"])
+    )
+    return html_page(f'<div class="reader">{images}</div>')
+
+
+# ----- Wolftoon -----
+WOLFTOON_KEY = "eyJtb2NrIjoid29sZnRvb24ifQ.mock.signature"
+
+
+async def wolftoon_index(request):
+    return html_page('<div id="root"></div><script type="module" src="/assets/index-mock.js"></script>')
+
+
+async def wolftoon_script(request):
+    script = f'const e="https://mock.supabase.co",t="{WOLFTOON_KEY}";export{{e,t}};'
+    return web.Response(text=script, content_type="application/javascript")
+
+
+def check_apikey(request):
+    if request.query.get("apikey") != WOLFTOON_KEY:
+        raise web.HTTPUnauthorized(text='{"message":"Invalid API key"}', content_type="application/json")
+
+
+_ILIKE = re.compile(r'title\.ilike\."\*(.*?)\*"')
+
+
+async def wolftoon_titles(request):
+    check_apikey(request)
+    fixtures = request.app["fixtures"]
+    limit = query_int(request, "limit", len(fixtures.mangas))
+    offset = query_int(request, "offset", 0)
+
+    match = _ILIKE.search(request.query.get("or", ""))
+    if match:
+        term = match.group(1).replace('\\"', '"').replace("\\\\", "\\")
+        items = fixtures.search(term, limit, offset)
+    else:
+        items = fixtures.mangas[offset:offset + limit]
+
+    return web.json_response(items)
+
+
+async def wolftoon_chapters(request):
+    check_apikey(request)
+    fixtures = request.app["fixtures"]
+    base = origin(request)
+
+    chapter_filter = request.query.get("id", "")
+    if chapter_filter.startswith("eq."):
+        chapter_id = chapter_filter[3:]
+        paths = fixtures.image_paths(chapter_id)
+        return web.json_response([{"images": [f"{base}/cdn/{path}" for path in paths]}])
+
+    manga_id = request.query.get("title_id", "").removeprefix("eq.")
+    chapters = [
+        {"id": ch["id"], "chapter_number": ch["number"]}
+        for ch in reversed(fixtures.chapters(manga_id))
+    ]
+
+    after = request.query.get("chapter_number", "")
+    if after.startswith("gt."):
+        chapters = [ch for ch in chapters if ch["chapter_number"] > float(after[3:])]
+
+    return web.json_response(chapters)
+
+
+# ----- controle -----
+async def ready(request):
+    return web.json_response({"ok": True})
+
+
+async def config(request):
+    faults = request.app["faults"]
+    if request.method == "POST":
+        faults.update(await request.json())
+    return web.json_response(faults.as_dict())
+
+
+# ==========================================================
+# APP
+# ==========================================================
+
+def create_app(fixtures=None, faults=None, recorded=None):
+    app = web.Application(middlewares=[inject_faults])
+    app["fixtures"] = fixtures or FixtureSet()
+    app["faults"] = faults or Faults()
+    app["recorded"] = os.path.abspath(recorded) if recorded else None
+
+    app.router.add_get("/_ready", ready)
+    app.router.add_get("/_config", config)
+    app.router.add_post("/_config", config)
+
+    app.router.add_get("/api.toonbr.com/api/manga", toonbr_list)
+    app.router.add_get("/api.toonbr.com/api/manga/{slug}", toonbr_manga)
+    app.router.add_get("/api.toonbr.com/api/chapter/{chapter_id}", toonbr_chapter)
+    app.router.add_get("/cdn2.toonbr.com/{path:.*}", image)
+
+    app.router.add_get("/api.mangaflix.net/v1/search/mangas", mangaflix_search)
+    app.router.add_get("/api.mangaflix.net/v1/mangas/{manga_id}", mangaflix_manga)
+    app.router.add_get("/api.mangaflix.net/v1/chapters/{chapter_id}", mangaflix_chapter)
+
+    app.router.add_get("/mangalivre.blog", mangalivre_search)
+    app.router.add_get("/mangalivre.blog/", mangalivre_search)
+    app.router.add_get("/mangalivre.blog/manga/{manga_id}", mangalivre_manga)
+    app.router.add_get("/mangalivre.blog/capitulo/{chapter_id}", mangalivre_chapter)
+
+    app.router.add_get("/wolftoon.lovable.app", wolftoon_index)
+    app.router.add_get("/wolftoon.lovable.app/assets/index-mock.js", wolftoon_script)
+    app.router.add_get("/supabase.co/rest/v1/titles", wolftoon_titles)
+    app.router.add_get("/supabase.co/rest/v1/chapters", wolftoon_chapters)
+
+    app.router.add_get("/cdn/{path:.*}", image)
+    return app
+
+
+def point_sources_at(base, toonbr=None, mangaflix=None, mangalivre=None, wolftoon=None):
+    """
+    Redireciona instâncias das fontes para o servidor em `base`.
+    """
+    if toonbr is not None:
+        toonbr.api_url = f"{base}/api.toonbr.com"
+        toonbr.cdn_url = f"{base}/cdn2.toonbr.com"
+    if mangaflix is not None:
+        mangaflix.api_url = f"{base}/api.mangaflix.net/v1"
+    if mangalivre is not None:
+        mangalivre.base_url = f"{base}/mangalivre.blog"
+    if wolftoon is not None:
+        wolftoon.base_url = f"{base}/wolftoon.lovable.app"
+        wolftoon.supabase_url = f"{base}/supabase.co"
+        wolftoon.api_key = None
+        # não mistura a chave do servidor de teste com a chave real salva
+        wolftoon.key_path = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de teste das fontes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0, help="latência em ms")
+    parser.add_argument("--jitter", type=float, default=0, help="variação da latência em ms")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bytes/s por resposta (0 = sem limite)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 503")
+    parser.add_argument("--mangas", type=int, default=500)
+    parser.add_argument("--chapters", type=int, default=120)
+    parser.add_argument("--image-size", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--recorded", help="diretório com respostas gravadas")
+    args = parser.parse_args()
+
+    fixtures = FixtureSet(args.mangas, args.chapters, args.image_size, args.seed)
+    faults = Faults(args.latency, args.jitter, args.bandwidth, args.error_rate, args.seed)
+    app = create_app(fixtures, faults, args.recorded)
+
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+# benchmarks/suite.py
+#
+# Suíte de benchmarks offline: sobe benchmarks/mock_server num processo
+# separado, aponta as quatro fontes para ele e mede
+#
+#   - search: latência da busca em todas as fontes ao mesmo tempo (fan-out)
+#   - chapters: tempo de obter + interpretar a lista de capítulos
+#   - cbz: vazão e pico de memória do create_cbz (capítulo pequeno e de 300 páginas)
+#
+# O resultado sai em JSON para comparar uma execução com outra:
+#
+#   python -m benchmarks.suite --latency 80 --jitter 20 --output antes.json
+#   python -m benchmarks.suite --latency 80 --jitter 20 --compare antes.json
+#
+# Os chapters rodam sem falhas injetadas, para medir só o parse; search e
+# cbz usam --latency/--jitter/--bandwidth/--error-rate.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import WORDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARKS = ("chapters", "search", "cbz")
+
+
+# ==========================================================
+# SERVIDOR
+# ==========================================================
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, port):
+    cmd = [
+        sys.executable, "-m", "benchmarks.mock_server",
+        "--port", str(port),
+        "--mangas", str(args.mangas),
+        "--chapters", str(args.chapters),
+        "--image-size", str(args.image_size),
+        "--seed", str(args.seed),
+    ]
+    if args.recorded:
+        cmd += ["--recorded", args.recorded]
+    return subprocess.Popen(cmd, cwd=ROOT)
+
+
+async def wait_ready(control, base, server):
+    for _ in range(100):
+        if server.poll() is not None:
+            raise RuntimeError("Servidor de teste encerrou ao iniciar")
+        try:
+            r = await control.get(f"{base}/_ready")
+            if r.status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("Servidor de teste não respondeu")
+
+
+async def set_faults(control, base, **values):
+    r = await control.post(f"{base}/_config", json=values)
+    return r.json()
+
+
+# ==========================================================
+# MEDIDAS
+# ==========================================================
+
+def summary(seconds):
+    values = sorted(seconds)
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "p50_ms": round(values[len(values) // 2] * 1000, 3),
+        "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 3),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+async def bench_search(sources, queries, rounds):
+    latencies = {source.name: [] for source in sources}
+    empty = {source.name: 0 for source in sources}
+    fanout = []
+
+    async def timed(source, query):
+        start = time.perf_counter()
+        try:
+            results = await source.search(query)
+        except Exception:
+            results = []
+        latencies[source.name].append(time.perf_counter() - start)
+        if not results:
+            empty[source.name] += 1
+
+    for _ in range(rounds):
+        for query in queries:
+            start = time.perf_counter()
+            await asyncio.gather(*(timed(source, query) for source in sources))
+            fanout.append(time.perf_counter() - start)
+
+    return {
+        "queries": len(queries) * rounds,
+        "fanout": summary(fanout),
+        "sources": {
+            name: {**summary(values), "empty": empty[name]}
+            for name, values in latencies.items()
+        },
+    }
+
+
+async def bench_chapters(sources, manga_id, rounds):
+    results = {}
+
+    for source in sources:
+        # o MangaLivreBlog usa a URL da página do mangá como id
+        manga = f"{source.base_url}/manga/{manga_id}" if source.name == "MangaLivreBlog" else manga_id
+        wall, cpu = [], []
+        count = 0
+
+        for _ in range(rounds):
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            chapters = await source.chapters(manga)
+            wall.append(time.perf_counter() - start_wall)
+            cpu.append(time.process_time() - start_cpu)
+            count = len(chapters)
+
+        results[source.name] = {"chapters": count, "wall": summary(wall), "cpu": summary(cpu)}
+
+    return results
+
+
+async def bench_cbz(base, pages, rounds, token):
+    from utils.cbz import create_cbz
+
+    def urls(run):
+        # URLs novas a cada rodada: o cache de imagens nunca acerta
+        return [f"{base}/cdn/{token}-{run}-p{pages}/{i:03d}.jpg" for i in range(pages)]
+
+    times = []
+    size = 0
+    for run in range(rounds):
+        start = time.perf_counter()
+        cbz_file, _ = await create_cbz(urls(run), "Bench", f"Cap_{pages}", compact=False)
+        times.append(time.perf_counter() - start)
+        size = cbz_file.seek(0, 2)
+        cbz_file.close()
+
+    # pico de memória numa rodada à parte: o tracemalloc deixa tudo mais lento
+    tracemalloc.start()
+    cbz_file, _ = await create_cbz(urls("mem"), "Bench", f"Cap_{pages}", compact=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cbz_file.close()
+
+    median = sorted(times)[len(times) // 2]
+    return {
+        "pages": pages,
+        "cbz_bytes": size,
+        "seconds": summary(times),
+        "mb_per_s": round(size / median / 1e6, 3),
+        "pages_per_s": round(pages / median, 3),
+        "peak_traced_bytes": peak,
+    }
+
+
+# ==========================================================
+# EXECUÇÃO
+# ==========================================================
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return None
+
+
+async def run(args):
+    # importados aqui: o config lê IMAGE_CACHE_DIR na importação
+    import httpx
+
+    from sources.toonbr import ToonBrSource
+    from sources.mangaflix import MangaFlixSource
+    from sources.mangalivreblog import MangaLivreBlogSource
+    from sources.wolftoon import WolftoonSource
+    from utils.http import close_all
+    from benchmarks.mock_server import point_sources_at
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = start_server(args, port)
+
+    toonbr, mangaflix = ToonBrSource(), MangaFlixSource()
+    mangalivre, wolftoon = MangaLivreBlogSource(), WolftoonSource()
+    point_sources_at(base, toonbr, mangaflix, mangalivre, wolftoon)
+    sources = [toonbr, mangaflix, mangalivre, wolftoon]
+
+    faults = {
+        "latency_ms": args.latency,
+        "jitter_ms": args.jitter,
+        "bandwidth": args.bandwidth,
+        "error_rate": args.error_rate,
+    }
+    results = {}
+
+    async with httpx.AsyncClient() as control:
+        try:
+            await wait_ready(control, base, server)
+
+            if "chapters" in args.only:
+                await set_faults(control, base, latency_ms=0, jitter_ms=0, bandwidth=0, error_rate=0)
+                results["chapters"] = await bench_chapters(sources, "m0001", args.rounds)
+
+            await set_faults(control, base, **faults)
+
+            if "search" in args.only:
+                results["search"] = await bench_search(sources, WORDS[:args.queries], args.rounds)
+
+            if "cbz" in args.only:
+                token = f"bench{int(time.time())}"
+                results["cbz"] = {
+                    "small": await bench_cbz(base, args.small_pages, args.rounds, token),
+                    "large": await bench_cbz(base, args.large_pages, args.rounds, token),
+                }
+
+            server_stats = await set_faults(control, base)
+        finally:
+            await close_all()
+            server.terminate()
+            server.wait()
+
+    results["meta"] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "faults": faults,
+        "server_requests": server_stats["requests"],
+        "server_errors": server_stats["errors"],
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    return results
+
+
+# ==========================================================
+# COMPARAÇÃO
+# ==========================================================
+
+def flatten(data, prefix=""):
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def compare(baseline, current):
+    old = dict(flatten(baseline))
+    for path, value in flatten(current):
+        if path.startswith("meta.") or path not in old:
+            continue
+        before = old[path]
+        change = (value - before) / before * 100 if before else 0.0
+        print(f"{path:<45} {before:>14.3f} {value:>14.3f} {change:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline das fontes e do CBZ")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="ex: search,cbz")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=8, help="buscas por rodada")
+    parser.add_argument("--latency", type=float, default=50, help="latência em ms")
+    parser.add_argument("--jitter", type=float, default=10, help="variação da latência em ms")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bytes/s por resposta (0 = sem limite)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--mangas", type=int, default=500)
+    parser.add_argument("--chapters", type=int, default=500, help="capítulos por mangá")
+    parser.add_argument("--image-size", type=int, default=200_000)
+    parser.add_argument("--small-pages", type=int, default=20)
+    parser.add_argument("--large-pages", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--recorded", help="diretório com respostas gravadas")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+    args.only = set(args.only.split(","))
+
+    # cache de imagens descartável: toda execução começa fria
+    cache_dir = tempfile.mkdtemp(prefix="bench-images-")
+    os.environ["IMAGE_CACHE_DIR"] = cache_dir
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,247 @@
 import os
+import socket
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+
+# ==========================================================
+# HTTP
+# ==========================================================
+
+# HTTP/2 só é usado se o pacote "h2" estiver instalado
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "0") == "1"
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+
+# Limite de conexões por host, ex: "cdn2.toonbr.com=8,api.mangaflix.net=4"
+HTTP_HOST_LIMITS = {
+    host.strip(): int(limit)
+    for host, limit in (
+        item.split("=", 1)
+        for item in os.getenv("HTTP_HOST_LIMITS", "").split(",")
+        if "=" in item
+    )
+}
+
+# ==========================================================
+# CACHE DE IMAGENS
+# ==========================================================
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "cache/images")
+# 0 desativa o cache
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# ==========================================================
+# CACHE DE FILE_ID DO TELEGRAM
+# ==========================================================
+
+FILE_ID_CACHE_PATH = os.getenv("FILE_ID_CACHE_PATH", "cache/file_ids.sqlite3")
+FILE_ID_TTL = int(os.getenv("FILE_ID_TTL", str(30 * 24 * 3600)))
+
+# ==========================================================
+# CBZ
+# ==========================================================
+
+# páginas baixadas à frente da que está sendo gravada no zip
+CBZ_DOWNLOAD_WINDOW = int(os.getenv("CBZ_DOWNLOAD_WINDOW", "16"))
+# acima disso o CBZ vai da memória para um arquivo temporário em disco
+CBZ_SPOOL_MAX_BYTES = int(os.getenv("CBZ_SPOOL_MAX_BYTES", str(8 * 1024 ** 2)))
+
+# Modo "compacto": reduz páginas largas e recodifica (requer Pillow)
+COMPACT_IMAGES = os.getenv("COMPACT_IMAGES", "0") == "1"
+COMPACT_MAX_WIDTH = int(os.getenv("COMPACT_MAX_WIDTH", "1080"))
+COMPACT_FORMAT = os.getenv("COMPACT_FORMAT", "webp").lower()
+COMPACT_QUALITY = int(os.getenv("COMPACT_QUALITY", "80"))
+COMPACT_WORKERS = int(os.getenv("COMPACT_WORKERS", "0")) or None
+
+# ==========================================================
+# CONCORRÊNCIA POR HOST (AIMD)
+# ==========================================================
+
+HOST_CONCURRENCY_INITIAL = int(os.getenv("HOST_CONCURRENCY_INITIAL", "4"))
+HOST_CONCURRENCY_MIN = int(os.getenv("HOST_CONCURRENCY_MIN", "1"))
+HOST_CONCURRENCY_MAX = int(os.getenv("HOST_CONCURRENCY_MAX", "16"))
+IMAGE_RETRIES = int(os.getenv("IMAGE_RETRIES", "3"))
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "0.5"))
+RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "30"))
+
+# ==========================================================
+# SAÚDE DAS FONTES
+# ==========================================================
+
+SOURCE_TIMEOUT = float(os.getenv("SOURCE_TIMEOUT", "15"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "60"))
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# ==========================================================
+# BUSCA
+# ==========================================================
+
+# prazo global: ao expirar, a lista é finalizada e resultados atrasados são mesclados depois
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "8"))
+# intervalo mínimo entre edições da mensagem de resultados
+SEARCH_EDIT_INTERVAL = float(os.getenv("SEARCH_EDIT_INTERVAL", "1.0"))
+
+# cache de search() por (fonte, consulta normalizada)
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "600"))
+# depois do TTL o resultado ainda é servido por este tempo enquanto atualiza em segundo plano
+QUERY_CACHE_STALE = float(os.getenv("QUERY_CACHE_STALE", "3600"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "2000"))
+
+# ==========================================================
+# SESSÕES
+# ==========================================================
+
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(6 * 3600)))
+# limites de memória: número de entradas e total de registros guardados
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "5000"))
+SESSION_MAX_RECORDS = int(os.getenv("SESSION_MAX_RECORDS", "500000"))
+# vazio = só memória; com caminho, as sessões sobrevivem a reinícios
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "")
+# espera antes de gravar as sessões alteradas, juntando várias num lote
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "1"))
+
+# ==========================================================
+# CATÁLOGO LOCAL
+# ==========================================================
+
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH", "cache/catalog.sqlite3")
+CATALOG_SYNC_INTERVAL = float(os.getenv("CATALOG_SYNC_INTERVAL", str(6 * 3600)))
+# sincronização completa (sem parar nas páginas já conhecidas)
+CATALOG_FULL_SYNC_INTERVAL = float(os.getenv("CATALOG_FULL_SYNC_INTERVAL", str(7 * 24 * 3600)))
+CATALOG_MAX_PAGES = int(os.getenv("CATALOG_MAX_PAGES", "500"))
+CATALOG_MIN_SCORE = float(os.getenv("CATALOG_MIN_SCORE", "0.6"))
+CATALOG_MAX_RESULTS = int(os.getenv("CATALOG_MAX_RESULTS", "50"))
+
+# ==========================================================
+# CACHE DE CAPÍTULOS
+# ==========================================================
+
+# dentro deste tempo a lista é usada sem revalidar
+CHAPTER_CACHE_FRESH = float(os.getenv("CHAPTER_CACHE_FRESH", "300"))
+CHAPTER_CACHE_TTL = float(os.getenv("CHAPTER_CACHE_TTL", str(7 * 24 * 3600)))
+
+# ==========================================================
+# FILA DE DOWNLOADS
+# ==========================================================
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "cache/jobs.sqlite3")
+# tempo que um worker tem para terminar um job antes dele voltar para a fila
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "900"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# jobs de um mesmo usuário processados ao mesmo tempo
+JOB_USER_MAX_IN_FLIGHT = int(os.getenv("JOB_USER_MAX_IN_FLIGHT", "1"))
+# dono dos aluguéis feitos por este bot e seus processos de worker: ao
+# iniciar, os aluguéis deixados pelo mesmo dono voltam para a fila. Workers
+# avulsos na mesma máquina que o bot precisam de um valor diferente.
+JOB_QUEUE_OWNER = os.getenv("JOB_QUEUE_OWNER", socket.gethostname())
+
+# ==========================================================
+# WORKERS
+# ==========================================================
+
+# unidades de worker iniciais; WORKER_MIN/WORKER_MAX limitam o autoajuste
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "2"))
+# 0 = cada unidade é uma task no processo do bot
+# 1 = cada unidade é um processo com WORKER_PROCESS_CONCURRENCY tasks
+WORKER_PROCESSES = os.getenv("WORKER_PROCESSES", "0") == "1"
+WORKER_PROCESS_CONCURRENCY = int(os.getenv("WORKER_PROCESS_CONCURRENCY", "2"))
+WORKER_MIN = int(os.getenv("WORKER_MIN", "1"))
+WORKER_MAX = int(os.getenv("WORKER_MAX", "8"))
+WORKER_AUTOSCALE = os.getenv("WORKER_AUTOSCALE", "1") == "1"
+AUTOSCALE_INTERVAL = float(os.getenv("AUTOSCALE_INTERVAL", "30"))
+# carga média por CPU acima da qual o pool encolhe
+AUTOSCALE_CPU_HIGH = float(os.getenv("AUTOSCALE_CPU_HIGH", "0.85"))
+# rodadas sem voltar a um tamanho que não aumentou a vazão
+AUTOSCALE_HOLD_INTERVALS = int(os.getenv("AUTOSCALE_HOLD_INTERVALS", "10"))
+
+# ==========================================================
+# VOLUMES
+# ==========================================================
+
+# tamanho máximo de cada volume (limite de upload de bots: 50 MB)
+VOLUME_MAX_BYTES = int(os.getenv("VOLUME_MAX_BYTES", str(50 * 1000 * 1000)))
+
+# ==========================================================
+# PREFETCH
+# ==========================================================
+
+# quantos capítulos seguintes preparar
+PREFETCH_AHEAD = int(os.getenv("PREFETCH_AHEAD", "2"))
+# validade da lista de páginas (URLs de CDN podem expirar)
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "1800"))
+PREFETCH_MAX_ENTRIES = int(os.getenv("PREFETCH_MAX_ENTRIES", "2000"))
+# também baixar as imagens para o cache em disco
+PREFETCH_IMAGES = os.getenv("PREFETCH_IMAGES", "0") == "1"
+# orçamento de banda do prefetch (imagens e listas de páginas)
+PREFETCH_BYTES_PER_HOUR = int(os.getenv("PREFETCH_BYTES_PER_HOUR", str(2 * 1024 ** 3)))
+# custo estimado de buscar a lista de páginas de um capítulo (HTML/JSON)
+PREFETCH_PAGES_COST = int(os.getenv("PREFETCH_PAGES_COST", str(256 * 1024)))
+
+# ==========================================================
+# HTML
+# ==========================================================
+
+# "auto" escolhe o mais rápido instalado: selectolax > lxml > bs4
+HTML_BACKEND = os.getenv("HTML_BACKEND", "auto")
+
+# ==========================================================
+# SERVIDOR HTTP (MÉTRICAS E SAÚDE)
+# ==========================================================
+
+# /metrics (Prometheus) e /health; WEB_PORT=0 desliga
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", os.getenv("PORT", "8080")))
+# intervalo em que os processos de worker mandam suas métricas ao bot
+METRICS_PUSH_INTERVAL = float(os.getenv("METRICS_PUSH_INTERVAL", "10"))
+
+# ==========================================================
+# TELEGRAM (LIMITES DE ENVIO)
+# ==========================================================
+
+# mensagens por segundo no total
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+# mensagens por segundo num chat privado
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+# mensagens por minuto num grupo
+TELEGRAM_GROUP_RATE = float(os.getenv("TELEGRAM_GROUP_RATE", "20"))
+# rajada permitida por chat
+TELEGRAM_BURST = int(os.getenv("TELEGRAM_BURST", "3"))
+# RetryAfter seguidos antes de desistir da chamada
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "5"))
+
+# ==========================================================
+# WEBHOOK
+# ==========================================================
+
+# URL pública do bot (ex: https://bot.exemplo.com); vazio = long polling.
+# O webhook é servido pelo mesmo servidor de WEB_HOST:WEB_PORT.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+# conferido no cabeçalho X-Telegram-Bot-Api-Secret-Token; obrigatório com WEBHOOK_URL
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+# updates processados ao mesmo tempo (webhook e polling)
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))
+
+# ==========================================================
+# FONTES
+# ==========================================================
+
+# "Nome=modulo:Classe" separados por vírgula; pacotes instalados também
+# podem registrar fontes no entry point "mangabot.sources"
+SOURCES = os.getenv(
+    "SOURCES",
+    "ToonBr=sources.toonbr:ToonBrSource,"
+    "MangaFlix=sources.mangaflix:MangaFlixSource,"
+    "MangaLivreBlog=sources.mangalivreblog:MangaLivreBlogSource,"
+    "Wolftoon=sources.wolftoon:WolftoonSource",
+)
+# limite do aquecimento de cada fonte no início
+SOURCE_WARMUP_TIMEOUT = float(os.getenv("SOURCE_WARMUP_TIMEOUT", "10"))
+# chave anônima do Wolftoon salva entre reinícios
+WOLFTOON_KEY_PATH = os.getenv("WOLFTOON_KEY_PATH", "cache/wolftoon_key.json")
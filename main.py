@@ -2,8 +2,11 @@ import os
 import asyncio
 import logging
 import math
+import signal
+import time
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
@@ -11,18 +14,60 @@ from telegram.ext import (
     ContextTypes,
 )
 
-from utils.loader import get_all_sources
-from utils.cbz import create_cbz
+from config import (
+    SEARCH_DEADLINE,
+    SEARCH_EDIT_INTERVAL,
+    VOLUME_MAX_BYTES,
+    PREFETCH_AHEAD,
+    WORKER_PROCESSES,
+    WEB_HOST,
+    WEB_PORT,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS,
+    UPDATE_CONCURRENCY,
+)
+from utils.loader import get_all_sources, warmup as warmup_sources
+from utils.cbz import create_cbz, create_volumes
+from utils.http import close_all as close_http_clients
+from utils.file_id_cache import file_id_cache
+from utils.transcode import shutdown_pool as shutdown_transcode_pool
+from utils.health import get_health
+from utils.query_cache import query_cache
+from utils.catalog import catalog
+from utils.session_store import (
+    RESULTS,
+    USER_SESSIONS,
+    SearchResult,
+    MangaSession,
+    Chapter,
+    flush as flush_sessions,
+)
+from utils.chapter_cache import chapter_cache
+from utils.prefetch import prefetcher
+from utils.job_queue import job_queue, FAILED, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from utils.singleflight import SingleFlight, LeaderCancelled
+from utils.worker_pool import WorkerPool, WorkerState
+from utils.outbound import outbound, PRIORITY_UPLOAD
+from utils.metrics import STAGE_SECONDS, CACHE_HITS, CACHE_MISSES, GaugeFunc
+from utils.web import create_app as create_web_app, start_server as start_web_server, add_webhook
 
 logging.basicConfig(level=logging.INFO)
 
-DOWNLOAD_QUEUE = asyncio.Queue()
-DOWNLOAD_SEMAPHORE = asyncio.Semaphore(2)
+CHAPTER_BUILDS = SingleFlight()
+WORKER_POOL = None
+WEB_RUNNER = None
+CATALOG_SYNC = None
 
-SEARCH_CACHE = {}
+GaugeFunc("workers", "Jobs processados ao mesmo tempo", lambda: WORKER_POOL.size() if WORKER_POOL else 0)
+
+BACKGROUND_TASKS = set()
 RESULTS_PER_PAGE = 10
 CHAPTERS_PER_PAGE = 15
 
+SESSION_EXPIRED = "⌛ Sessão expirada, faça a busca novamente."
+
 
 # ==========================================================
 # DONO DO BOTÃO
@@ -35,93 +80,406 @@ def is_owner(query):
         return False
 
 
+def format_position(job_id):
+    position, eta = job_queue.position(job_id, WORKER_POOL.size() if WORKER_POOL else 1)
+    if not position:
+        return ""
+    minutes = math.ceil(eta / 60)
+    return f"\nPosição na fila: {position} (~{minutes} min)"
+
+
+def results_id_from(query):
+    # botões antigos não tinham o id da mensagem de resultados
+    parts = query.data.split("|")
+    return int(parts[2]) if len(parts) > 3 else query.message.message_id
+
+
+# ==========================================================
+# SESSÃO DO USUÁRIO
+# ==========================================================
+
+async def load_chapters(source_name, manga_url, title):
+    # uma lista por mangá, compartilhada por todos que estão navegando nele
+    source = get_all_sources()[source_name]
+    return await chapter_cache.get(source_name, source, manga_url, title)
+
+
+async def current_manga(user_id):
+    session = USER_SESSIONS.get(user_id)
+    if session is None:
+        return None, None
+
+    chapters = session.chapters
+    if chapters is None:
+        chapters = await load_chapters(session.source, session.url, session.title)
+
+    return session, chapters
+
+
 # ==========================================================
 # WORKER
 # ==========================================================
 
-async def worker():
-    while True:
-        job = await DOWNLOAD_QUEUE.get()
+async def worker(bot, state=None):
+    state = state or WorkerState()
+
+    while not state.stopping:
+        job = await job_queue.get()
+        state.busy = True
+        start = time.monotonic()
+        renewal = asyncio.create_task(job_queue.keep_leased(job))
         try:
-            await send_chapter(job)
+            if "chapters" in job.payload:
+                nbytes, requeued = await send_volume(bot, job)
+            else:
+                nbytes, requeued = await send_chapter(bot, job), False
+            if not requeued:
+                job_queue.ack(job.id)
+            state.report(job.id, time.monotonic() - start, nbytes, True)
         except Exception as e:
             print("Erro worker:", e)
-        DOWNLOAD_QUEUE.task_done()
+            state.report(job.id, time.monotonic() - start, 0, False)
+            if await job_queue.nack(job, e) == FAILED:
+                await reply_text(bot, job, "❌ Erro ao enviar capítulo.")
+        finally:
+            renewal.cancel()
+            state.busy = False
+
+
+async def reply_text(bot, job, text):
+    try:
+        await outbound.send(job.chat_id, lambda: bot.send_message(
+            job.chat_id,
+            text,
+            reply_to_message_id=job.reply_to,
+            allow_sending_without_reply=True,
+        ))
+    except Exception as e:
+        print("Erro ao responder:", e)
+
+
+async def reply_document(bot, job, document, filename=None):
+    if hasattr(document, "read"):
+        # CBZ abaixo de CBZ_SPOOL_MAX_BYTES fica só na memória, sem .name, e o
+        # PTB não aceita arquivo sem nome: vai como bytes (que também servem
+        # para reenviar depois de um RetryAfter)
+        document.seek(0)
+        document = document.read()
+
+    def upload():
+        return bot.send_document(
+            job.chat_id,
+            document=document,
+            filename=filename,
+            reply_to_message_id=job.reply_to,
+            allow_sending_without_reply=True,
+        )
+
+    return await outbound.send(job.chat_id, upload, priority=PRIORITY_UPLOAD)
+
+
+async def send_text(message, text, **kwargs):
+    return await outbound.send(message.chat_id, lambda: message.reply_text(text, **kwargs))
+
+
+async def edit_text(message, text, **kwargs):
+    # edições da mesma mensagem ainda na fila viram uma só
+    return await outbound.send(
+        message.chat_id,
+        lambda: message.edit_text(text, **kwargs),
+        coalesce=(message.chat_id, message.message_id),
+    )
 
 
-async def send_chapter(job):
+class ChapterError(Exception):
+    # erro com mensagem para o usuário; não adianta tentar de novo
+    pass
 
-    async with DOWNLOAD_SEMAPHORE:
 
-        message = job["message"]
-        source = job["source"]
-        chapter = job["chapter"]
+async def send_chapter(bot, job):
+    """
+    Envia o capítulo do job e retorna quantos bytes foram enviados por este
+    job (0 quando reaproveitou um file_id).
+    """
 
+    source = get_all_sources()[job.source]
+    chapter = job.chapter
+
+    # capítulo já enviado antes: reenvia pelo file_id
+    file_id = file_id_cache.get(source.name, chapter.url)
+    if file_id:
+        CACHE_HITS.inc(cache="file_id")
         try:
-            pages = await source.pages(chapter["url"])
-        except:
-            await message.reply_text("❌ Erro ao obter páginas.")
-            return
+            await reply_document(bot, job, file_id)
+            prefetch_next(source, job)
+            return 0
+        except BadRequest:
+            file_id_cache.invalidate(source.name, chapter.url)
+    else:
+        CACHE_MISSES.inc(cache="file_id")
+
+    # pedidos simultâneos do mesmo capítulo: só o primeiro baixa e envia,
+    # os outros recebem o file_id dele
+    key = (source.name, str(chapter.url))
 
-        if not pages:
-            await message.reply_text("❌ Nenhuma página encontrada.")
-            return
+    def build():
+        return build_chapter(bot, job, source, chapter)
 
+    try:
         try:
-            cbz_buffer, cbz_name = await create_cbz(
-                pages,
-                chapter.get("manga_title", "Manga"),
-                f"Cap_{chapter.get('chapter_number')}",
-            )
-        except:
-            await message.reply_text("❌ Erro ao criar CBZ.")
-            return
+            (file_id, nbytes, missing), shared = await CHAPTER_BUILDS.do(key, build)
+        except LeaderCancelled:
+            # quem estava montando foi cancelado: tenta de novo (agora pode ser este)
+            (file_id, nbytes, missing), shared = await CHAPTER_BUILDS.do(key, build)
+
+        if shared and not file_id:
+            # o envio do outro não devolveu documento para reaproveitar
+            (file_id, nbytes, missing), shared = await build(), False
+    except ChapterError as e:
+        await reply_text(bot, job, str(e))
+        return 0
+
+    prefetch_next(source, job)
+
+    if shared and file_id:
+        await reply_document(bot, job, file_id)
+
+    if missing:
+        pages = ", ".join(str(n) for n in missing)
+        await reply_text(bot, job, f"⚠️ Cap {chapter.number} enviado sem as páginas {pages} (falharam no download).")
+
+    return 0 if shared else nbytes
+
+
+def prefetch_next(source, job):
+    # o usuário provavelmente pede o próximo capítulo em seguida
+    upcoming = [Chapter(*ch) for ch in job.payload.get("next", [])]
+    if upcoming:
+        prefetcher.schedule(source.name, source, upcoming)
+
+
+def next_chapters(chapters, index):
+    # a lista vem do mais novo para o mais antigo: os seguintes ficam antes
+    return chapters[max(0, index - PREFETCH_AHEAD):index][::-1]
+
+
+async def build_chapter(bot, job, source, chapter):
 
-        await message.reply_document(document=cbz_buffer, filename=cbz_name)
-        cbz_buffer.close()
+    try:
+        with STAGE_SECONDS.time(stage="pages"):
+            pages = await prefetcher.get_pages(source.name, source, chapter.url)
+    except:
+        raise ChapterError("❌ Erro ao obter páginas.")
+
+    if not pages:
+        raise ChapterError("❌ Nenhuma página encontrada.")
+
+    missing = []
+    try:
+        cbz_file, cbz_name = await create_cbz(
+            pages,
+            chapter.manga_title or "Manga",
+            f"Cap_{chapter.number}",
+            missing=missing,
+        )
+    except:
+        raise ChapterError("❌ Erro ao criar CBZ.")
 
+    try:
+        nbytes = cbz_file.seek(0, 2)
+        cbz_file.seek(0)
+        with STAGE_SECONDS.time(stage="upload"):
+            sent = await reply_document(bot, job, cbz_file, cbz_name)
+    finally:
+        cbz_file.close()
+
+    if not sent.document:
+        return None, nbytes, missing
+
+    # capítulo incompleto não vai para o cache: o próximo pedido tenta de novo
+    if not missing:
+        file_id_cache.put(source.name, chapter.url, sent.document.file_id, cbz_name)
+    return sent.document.file_id, nbytes, missing
+
+
+async def send_volume(bot, job):
+    """
+    Job de volume: os capítulos do mangá em um ou mais CBZ, cortados em
+    VOLUME_MAX_BYTES. Cada execução envia um volume só: o ponto de retomada
+    vai para o payload e o job volta para a fila, para que uma série longa
+    não prenda o worker nem os pedidos interativos do mesmo usuário.
+    Capítulos e páginas que falharam são avisados no fim.
+    Retorna (bytes enviados, se o job voltou para a fila).
+    """
+    source = get_all_sources()[job.source]
+    chapters = [Chapter(*ch) for ch in job.payload["chapters"]]
+    resume_at, resume_page = job.payload.get("resume") or (0, 0)
+    # índice do capítulo -> páginas que falharam (None = capítulo inteiro)
+    missing = {int(k): v for k, v in job.payload.get("missing", {}).items()}
+
+    async def chapter_pages():
+        for i, chapter in enumerate(chapters[resume_at:], resume_at):
+            try:
+                pages = await prefetcher.get_pages(source.name, source, chapter.url)
+            except Exception as e:
+                print(f"Erro ao obter páginas do Cap {chapter.number}:", e)
+                pages = None
+            if not pages:
+                missing[i] = None
+                continue
+            yield i, f"Cap_{chapter.number}", pages, resume_page if i == resume_at else 0
+
+    nbytes = 0
+    title = job.chapter.manga_title or "Manga"
+    volumes = create_volumes(chapter_pages(), title, VOLUME_MAX_BYTES, missing=missing)
+
+    async for cbz_file, cbz_name, resume in volumes:
+        try:
+            nbytes += cbz_file.seek(0, 2)
+            cbz_file.seek(0)
+            with STAGE_SECONDS.time(stage="upload"):
+                await reply_document(bot, job, cbz_file, cbz_name)
+        finally:
+            cbz_file.close()
+
+        if resume is not None:
+            await volumes.aclose()
+            job.payload["resume"] = list(resume)
+            job.payload["missing"] = {str(k): v for k, v in missing.items()}
+            if not await job_queue.requeue(job):
+                # aluguel perdido: o job já está com outro worker
+                print(f"Job {job.id}: aluguel perdido antes de voltar para a fila")
+            return nbytes, True
+
+    if not nbytes and "resume" not in job.payload:
+        await reply_text(bot, job, "❌ Nenhuma página encontrada.")
+    elif missing:
+        skipped = ", ".join(
+            f"{chapters[i].number}" if n is None else f"{chapters[i].number} ({n} páginas)"
+            for i, n in sorted(missing.items())
+        )
+        await reply_text(bot, job, f"⚠️ Ficaram de fora dos volumes: Cap {skipped}")
+
+    return nbytes, False
 
 # ==========================================================
-# BUSCAR EM TODAS AS FONTES (AGUARDANDO TODAS)
+# BUSCAR EM TODAS AS FONTES (PROGRESSIVO)
 # ==========================================================
 
 async def buscar(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     query_text = " ".join(context.args)
     if not query_text:
-        await update.message.reply_text("Use /bb <nome>")
+        await send_text(update.message, "Use /bb <nome>")
         return
 
-    msg = await update.message.reply_text("🔎 Buscando em todas as fontes...")
+    msg = await send_text(update.message, "🔎 Buscando em todas as fontes...")
+    user_id = update.effective_user.id
 
     sources = get_all_sources()
-    tasks = []
-
-    for source_name, source in sources.items():
-        tasks.append(search_source(source_name, source, query_text))
 
-    results = await asyncio.gather(*tasks)
+    # o catálogo local responde na hora; ao vivo só vão as fontes que ele
+    # não cobre por completo ou nas quais ele não achou nada (título novo
+    # que a sincronização ainda não trouxe)
+    combined = await catalog.search(query_text)
+    found_in = {r.source for r in combined}
+    live_sources = {
+        source_name: source
+        for source_name, source in sources.items()
+        if source_name not in found_in or not catalog.is_synced(source_name)
+    }
+
+    pending = {
+        asyncio.create_task(search_source(source_name, source, query_text))
+        for source_name, source in live_sources.items()
+    }
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SEARCH_DEADLINE
+    last_edit = 0.0
+    dirty = False
+
+    if combined:
+        RESULTS.set(msg.message_id, tuple(combined))
+        if pending:
+            await show_results(msg, user_id, 0, searching=True)
+            last_edit = loop.time()
+
+    # mostra os resultados conforme cada fonte responde, editando no máximo
+    # uma vez a cada SEARCH_EDIT_INTERVAL
+    while pending:
+        now = loop.time()
+        if now >= deadline:
+            break
+
+        timeout = deadline - now
+        if dirty:
+            timeout = min(timeout, max(0.0, last_edit + SEARCH_EDIT_INTERVAL - now))
+
+        done, pending = await asyncio.wait(
+            pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+
+        for task in done:
+            if merge_results(combined, task.result()):
+                RESULTS.set(msg.message_id, tuple(combined))
+                dirty = True
+
+        if dirty and pending and loop.time() - last_edit >= SEARCH_EDIT_INTERVAL:
+            await show_results(msg, user_id, 0, searching=True)
+            last_edit = loop.time()
+            dirty = False
+
+    if pending:
+        # prazo estourou: finaliza agora e mescla o que chegar depois
+        task = asyncio.create_task(merge_late_results(msg, user_id, pending, combined))
+        BACKGROUND_TASKS.add(task)
+        task.add_done_callback(BACKGROUND_TASKS.discard)
+
+    if combined:
+        await show_results(msg, user_id, 0)
+    elif not pending:
+        await edit_text(msg, "❌ Nenhum resultado encontrado.")
+
+
+async def merge_late_results(message, user_id, pending, combined):
+    done, _ = await asyncio.wait(pending)
+
+    added = False
+    for task in done:
+        added = merge_results(combined, task.result()) or added
 
-    combined = []
+    try:
+        if added:
+            RESULTS.set(message.message_id, tuple(combined))
+            await show_results(message, user_id, 0)
+        elif not combined:
+            await edit_text(message, "❌ Nenhum resultado encontrado.")
+    except Exception as e:
+        print("Erro ao mesclar resultados:", e)
+
+
+def merge_results(combined, results):
+    # o mesmo título pode vir do catálogo e da busca ao vivo
+    seen = {(r.source, str(r.url)) for r in combined}
+    added = False
     for r in results:
-        combined.extend(r)
-
-    if not combined:
-        await msg.edit_text("❌ Nenhum resultado encontrado.")
-        return
-
-    SEARCH_CACHE[msg.message_id] = combined
-
-    await show_results(msg, update.effective_user.id, 0)
+        if (r.source, str(r.url)) not in seen:
+            combined.append(r)
+            seen.add((r.source, str(r.url)))
+            added = True
+    return added
 
 
 async def search_source(name, source, query):
     try:
-        res = await source.search(query)
-        return [
-            {"source": name, "title": m["title"], "url": m["url"]}
-            for m in res
-        ]
+        health = get_health(name)
+        res = await query_cache.get_or_fetch(
+            name, query, lambda: health.call(lambda: source.search(query))
+        )
+        results = [SearchResult(name, m["title"], m["url"]) for m in res]
+        await catalog.add_results(results)
+        return results
     except:
         return []
 
@@ -130,9 +488,14 @@ async def search_source(name, source, query):
 # RESULTADOS PAGINADOS
 # ==========================================================
 
-async def show_results(message, user_id, page):
+async def show_results(message, user_id, page, searching=False, results_id=None):
+
+    results_id = results_id or message.message_id
+    data = RESULTS.get(results_id)
+    if not data:
+        await edit_text(message, SESSION_EXPIRED)
+        return
 
-    data = SEARCH_CACHE[message.message_id]
     total_pages = math.ceil(len(data) / RESULTS_PER_PAGE)
 
     start = page * RESULTS_PER_PAGE
@@ -143,24 +506,29 @@ async def show_results(message, user_id, page):
     for i, item in enumerate(data[start:end], start=start):
         buttons.append([
             InlineKeyboardButton(
-                f"{item['title']} ({item['source']})",
-                callback_data=f"select|{i}|{user_id}"
+                f"{item.title} ({item.source})",
+                callback_data=f"select|{i}|{results_id}|{user_id}"
             )
         ])
 
     nav = []
 
     if page > 0:
-        nav.append(InlineKeyboardButton("«", callback_data=f"page|{page-1}|{user_id}"))
+        nav.append(InlineKeyboardButton("«", callback_data=f"page|{page-1}|{results_id}|{user_id}"))
 
     if page < total_pages - 1:
-        nav.append(InlineKeyboardButton("»", callback_data=f"page|{page+1}|{user_id}"))
+        nav.append(InlineKeyboardButton("»", callback_data=f"page|{page+1}|{results_id}|{user_id}"))
 
     if nav:
         buttons.append(nav)
 
-    await message.edit_text(
-        f"📚 Resultados ({page+1}/{total_pages})",
+    header = f"📚 Resultados ({page+1}/{total_pages})"
+    if searching:
+        header += "\n⏳ Buscando nas outras fontes..."
+
+    await edit_text(
+        message,
+        header,
         reply_markup=InlineKeyboardMarkup(buttons)
     )
 
@@ -171,7 +539,11 @@ async def show_results(message, user_id, page):
 
 async def show_chapters(message, context, page, user_id):
 
-    chapters = context.user_data["chapters"]
+    session, chapters = await current_manga(user_id)
+    if session is None:
+        await edit_text(message, SESSION_EXPIRED)
+        return
+
     total_pages = math.ceil(len(chapters) / CHAPTERS_PER_PAGE)
 
     start = page * CHAPTERS_PER_PAGE
@@ -182,7 +554,7 @@ async def show_chapters(message, context, page, user_id):
     for i, chap in enumerate(chapters[start:end], start=start):
         buttons.append([
             InlineKeyboardButton(
-                f"Cap {chap.get('chapter_number')}",
+                f"Cap {chap.number}",
                 callback_data=f"download_one|{i}|{user_id}"
             )
         ])
@@ -198,14 +570,22 @@ async def show_chapters(message, context, page, user_id):
     buttons.append(nav)
 
     buttons.append([
-        InlineKeyboardButton("🔙 Voltar", callback_data=f"back|0|{user_id}")
+        InlineKeyboardButton("🔙 Voltar", callback_data=f"back|0|{session.results_id}|{user_id}")
     ])
 
-    await message.edit_text(
+    await edit_text(
+        message,
         f"📖 Capítulos ({page+1}/{total_pages})",
         reply_markup=InlineKeyboardMarkup(buttons)
     )
 
+    # só as listas de páginas dos primeiros capítulos visíveis; as imagens
+    # ficam para depois do envio. Com WORKER_PROCESSES quem monta os CBZ são
+    # os processos filhos, que não leem o prefetcher deste processo
+    if not WORKER_PROCESSES:
+        source = get_all_sources()[session.source]
+        prefetcher.schedule(source.name, source, chapters[start:end], images=False)
+
 
 # ==========================================================
 # CALLBACKS
@@ -218,7 +598,7 @@ async def change_page(update, context):
         return
 
     page = int(query.data.split("|")[1])
-    await show_results(query.message, query.from_user.id, page)
+    await show_results(query.message, query.from_user.id, page, results_id=results_id_from(query))
 
 
 async def select_manga(update, context):
@@ -228,24 +608,28 @@ async def select_manga(update, context):
         return
 
     index = int(query.data.split("|")[1])
-    data = SEARCH_CACHE[query.message.message_id][index]
-
-    source = get_all_sources()[data["source"]]
-    chapters = await source.chapters(data["url"])
+    results_id = results_id_from(query)
+    results = RESULTS.get(results_id)
 
-    context.user_data["chapters"] = chapters
-    context.user_data["source"] = source
-    context.user_data["title"] = data["title"]
+    if not results or index >= len(results):
+        await send_text(query.message, SESSION_EXPIRED)
+        return
 
+    data = results[index]
     user_id = query.from_user.id
 
+    chapters = await load_chapters(data.source, data.url, data.title)
+    USER_SESSIONS.set(user_id, MangaSession(data.source, data.url, data.title, results_id, chapters))
+
     buttons = [
         [InlineKeyboardButton("📥 Baixar tudo", callback_data=f"download_all|0|{user_id}")],
+        [InlineKeyboardButton("📦 Baixar tudo em volumes", callback_data=f"download_vol|0|{user_id}")],
         [InlineKeyboardButton("📖 Ver capítulos", callback_data=f"chap_page|0|{user_id}")]
     ]
 
-    await query.message.reply_text(
-        f"📖 {data['title']}\nTotal: {len(chapters)} capítulos",
+    await send_text(
+        query.message,
+        f"📖 {data.title}\nTotal: {len(chapters)} capítulos",
         reply_markup=InlineKeyboardMarkup(buttons)
     )
 
@@ -256,17 +640,66 @@ async def download_all(update, context):
     if not is_owner(query):
         return
 
-    chapters = context.user_data["chapters"]
-    source = context.user_data["source"]
+    session, chapters = await current_manga(query.from_user.id)
+    if session is None:
+        await send_text(query.message, SESSION_EXPIRED)
+        return
+
+    job_ids = await job_queue.enqueue_many([
+        {
+            "chat_id": query.message.chat_id,
+            "user_id": query.from_user.id,
+            "source": session.source,
+            "chapter": chap,
+            "reply_to": query.message.message_id,
+            "priority": PRIORITY_BULK,
+        }
+        for chap in chapters
+    ])
+
+    if not job_ids:
+        await send_text(query.message, "❌ Nenhum capítulo encontrado.")
+        return
+
+    await send_text(
+        query.message,
+        "📥 Todos capítulos adicionados na fila." + format_position(job_ids[0])
+    )
+
+
+async def download_volumes(update, context):
+    query = update.callback_query
+    await query.answer()
+    if not is_owner(query):
+        return
+
+    session, chapters = await current_manga(query.from_user.id)
+    if session is None:
+        await send_text(query.message, SESSION_EXPIRED)
+        return
+
+    if not chapters:
+        await send_text(query.message, "❌ Nenhum capítulo encontrado.")
+        return
 
-    for chap in chapters:
-        await DOWNLOAD_QUEUE.put({
-            "message": query.message,
-            "source": source,
-            "chapter": chap
-        })
+    # a lista vem do mais novo para o mais antigo; volumes seguem a leitura.
+    # Um job só, que volta para a fila a cada volume enviado
+    ordered = list(reversed(chapters))
+
+    job_id = await job_queue.enqueue(
+        chat_id=query.message.chat_id,
+        user_id=query.from_user.id,
+        source=session.source,
+        chapter=ordered[0],
+        reply_to=query.message.message_id,
+        priority=PRIORITY_BULK,
+        payload={"chapters": [list(ch) for ch in ordered]},
+    )
 
-    await query.message.reply_text("📥 Todos capítulos adicionados na fila.")
+    await send_text(
+        query.message,
+        "📦 Capítulos adicionados na fila em volumes." + format_position(job_id)
+    )
 
 
 async def download_one(update, context):
@@ -277,16 +710,22 @@ async def download_one(update, context):
 
     index = int(query.data.split("|")[1])
 
-    chap = context.user_data["chapters"][index]
-    source = context.user_data["source"]
+    session, chapters = await current_manga(query.from_user.id)
+    if session is None or index >= len(chapters):
+        await send_text(query.message, SESSION_EXPIRED)
+        return
 
-    await DOWNLOAD_QUEUE.put({
-        "message": query.message,
-        "source": source,
-        "chapter": chap
-    })
+    job_id = await job_queue.enqueue(
+        chat_id=query.message.chat_id,
+        user_id=query.from_user.id,
+        source=session.source,
+        chapter=chapters[index],
+        reply_to=query.message.message_id,
+        priority=PRIORITY_INTERACTIVE,
+        payload={"next": [list(ch) for ch in next_chapters(chapters, index)]},
+    )
 
-    await query.message.reply_text("📥 Capítulo adicionado na fila.")
+    await send_text(query.message, "📥 Capítulo adicionado na fila." + format_position(job_id))
 
 
 async def change_chap_page(update, context):
@@ -305,31 +744,123 @@ async def back_to_results(update, context):
     if not is_owner(query):
         return
 
-    await show_results(query.message, query.from_user.id, 0)
+    await show_results(query.message, query.from_user.id, 0, results_id=results_id_from(query))
 
 
 # ==========================================================
 # MAIN
 # ==========================================================
 
+async def start_web(app):
+    global WEB_RUNNER
+    web_app = create_web_app()
+
+    if WEBHOOK_URL:
+        async def handle_update(data):
+            # só enfileira: o Application processa até UPDATE_CONCURRENCY de uma vez
+            await app.update_queue.put(Update.de_json(data, app.bot))
+
+        add_webhook(web_app, WEBHOOK_PATH, WEBHOOK_SECRET, handle_update)
+
+    WEB_RUNNER = await start_web_server(web_app, WEB_HOST, WEB_PORT)
+
+
+async def stop_web():
+    global WEB_RUNNER
+    if WEB_RUNNER:
+        await WEB_RUNNER.cleanup()
+        WEB_RUNNER = None
+
+
+async def run_webhook(app):
+    """
+    Modo webhook: sem Updater, o Telegram entrega os updates no servidor
+    HTTP do bot. Várias instâncias podem ficar atrás de um balanceador.
+    """
+    await app.initialize()
+    await app.post_init(app)
+    await app.start()
+
+    await app.bot.set_webhook(
+        WEBHOOK_URL + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        allowed_updates=Update.ALL_TYPES,
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        # para de aceitar updates antes de parar o processamento
+        await stop_web()
+        await app.stop()
+        await app.post_shutdown(app)
+        await app.shutdown()
+
+
 def main():
-    app = ApplicationBuilder().token(os.getenv("BOT_TOKEN")).build()
+    builder = ApplicationBuilder().token(os.getenv("BOT_TOKEN")).concurrent_updates(UPDATE_CONCURRENCY)
+    if WEBHOOK_URL:
+        builder = builder.updater(None)
+    app = builder.build()
 
     app.add_handler(CommandHandler("bb", buscar))
     app.add_handler(CallbackQueryHandler(change_page, pattern="^page"))
     app.add_handler(CallbackQueryHandler(select_manga, pattern="^select"))
     app.add_handler(CallbackQueryHandler(download_all, pattern="^download_all"))
+    app.add_handler(CallbackQueryHandler(download_volumes, pattern="^download_vol"))
     app.add_handler(CallbackQueryHandler(download_one, pattern="^download_one"))
     app.add_handler(CallbackQueryHandler(change_chap_page, pattern="^chap_page"))
     app.add_handler(CallbackQueryHandler(back_to_results, pattern="^back"))
 
     async def startup(app):
-        asyncio.create_task(worker())
+        global WORKER_POOL, CATALOG_SYNC
+        # fontes carregadas, conexões abertas e chaves prontas antes do primeiro usuário
+        await warmup_sources()
+        # jobs que ficaram alugados quando o bot caiu
+        job_queue.recover()
+        WORKER_POOL = WorkerPool(worker, app.bot)
+        WORKER_POOL.start()
+        CATALOG_SYNC = asyncio.create_task(catalog.sync_loop(get_all_sources()))
+        if WEB_PORT:
+            await start_web(app)
+
+    async def shutdown(app):
+        await stop_web()
+        if CATALOG_SYNC:
+            CATALOG_SYNC.cancel()
+        if WORKER_POOL:
+            await WORKER_POOL.stop()
+        prefetcher.close()
+        outbound.close()
+        await close_http_clients()
+        file_id_cache.close()
+        flush_sessions()
+        catalog.close()
+        job_queue.close()
+        shutdown_transcode_pool()
 
     app.post_init = startup
-
-    print("🤖 Bot iniciado")
-    app.run_polling(drop_pending_updates=True)
+    app.post_shutdown = shutdown
+
+    if WEBHOOK_URL:
+        if not WEB_PORT:
+            raise SystemExit("WEBHOOK_URL precisa de WEB_PORT")
+        if not WEBHOOK_SECRET:
+            raise SystemExit("WEBHOOK_URL precisa de WEBHOOK_SECRET")
+        print("🤖 Bot iniciado (webhook)")
+        asyncio.run(run_webhook(app))
+    else:
+        print("🤖 Bot iniciado")
+        app.run_polling(drop_pending_updates=True)
 
 
 if __name__ == "__main__":
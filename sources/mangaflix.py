@@ -1,5 +1,7 @@
 import httpx
 
+from utils.http import get_client, conditional_headers, response_validators, preconnect
+
 
 class MangaFlixSource:
     name = "MangaFlix"
@@ -17,6 +19,9 @@ class MangaFlixSource:
 
     timeout = httpx.Timeout(60.0)
 
+    async def warmup(self):
+        await preconnect(self.api_url, http2=False)
+
     # ================= SEARCH =================
     async def search(self, query: str):
         if not query:
@@ -29,19 +34,14 @@ class MangaFlixSource:
             "selected_language": "pt-br"
         }
 
-        async with httpx.AsyncClient(
-            headers=self.headers,
-            timeout=self.timeout,
-            http2=False  # força HTTP/1.1
-        ) as client:
+        client = get_client(self.api_url, http2=False)  # força HTTP/1.1
+        r = await client.get(url, params=params, headers=self.headers, timeout=self.timeout)
 
-            r = await client.get(url, params=params)
+        if r.status_code != 200:
+            print("Search error:", r.status_code, r.text)
+            r.raise_for_status()
 
-            if r.status_code != 200:
-                print("Search error:", r.status_code, r.text)
-                return []
-
-            data = r.json()
+        data = r.json()
 
         results = []
 
@@ -55,21 +55,24 @@ class MangaFlixSource:
 
     # ================= CHAPTERS =================
     async def chapters(self, manga_id: str):
+        chapters, _ = await self.chapters_conditional(manga_id)
+        return chapters
+
+    async def chapters_conditional(self, manga_id: str, validators=None):
         url = f"{self.api_url}/mangas/{manga_id}"
+        headers = {**self.headers, **conditional_headers(validators)}
 
-        async with httpx.AsyncClient(
-            headers=self.headers,
-            timeout=self.timeout,
-            http2=False
-        ) as client:
+        client = get_client(self.api_url, http2=False)
+        r = await client.get(url, headers=headers, timeout=self.timeout)
 
-            r = await client.get(url)
+        if r.status_code == 304:
+            return None, validators
 
-            if r.status_code != 200:
-                print("Chapters error:", r.status_code, r.text)
-                return []
+        if r.status_code != 200:
+            print("Chapters error:", r.status_code, r.text)
+            return [], None
 
-            data = r.json()
+        data = r.json()
 
         manga_data = data.get("data", {})
         manga_title = manga_data.get("name", "Manga")
@@ -84,7 +87,7 @@ class MangaFlixSource:
                 "manga_title": manga_title
             })
 
-        return chapters
+        return chapters, response_validators(r)
 
     # ================= PAGES =================
     async def pages(self, chapter_id: str):
@@ -94,19 +97,14 @@ class MangaFlixSource:
             "selected_language": "pt-br"
         }
 
-        async with httpx.AsyncClient(
-            headers=self.headers,
-            timeout=self.timeout,
-            http2=False
-        ) as client:
+        client = get_client(self.api_url, http2=False)
+        r = await client.get(url, params=params, headers=self.headers, timeout=self.timeout)
 
-            r = await client.get(url, params=params)
-
-            if r.status_code != 200:
-                print("Pages error:", r.status_code, r.text)
-                return []
+        if r.status_code != 200:
+            print("Pages error:", r.status_code, r.text)
+            return []
 
-            data = r.json()
+        data = r.json()
 
         images = data.get("data", {}).get("images", [])
 
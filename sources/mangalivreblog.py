@@ -1,6 +1,7 @@
 import httpx
 import re
-from bs4 import BeautifulSoup
+from utils.html import extract
+from utils.http import get_client, conditional_headers, response_validators, preconnect
 
 
 class MangaLivreBlogSource:
@@ -15,6 +16,9 @@ class MangaLivreBlogSource:
 
     timeout = httpx.Timeout(60.0)
 
+    async def warmup(self):
+        await preconnect(self.base_url)
+
     # ================= SEARCH =================
     async def search(self, query: str):
         if not query:
@@ -22,52 +26,64 @@ class MangaLivreBlogSource:
 
         params = {"s": query}
 
-        async with httpx.AsyncClient(headers=self.headers, timeout=self.timeout) as client:
-            r = await client.get(self.base_url, params=params)
-
-            if r.status_code != 200:
-                return []
+        client = get_client(self.base_url)
+        r = await client.get(self.base_url, params=params, headers=self.headers, timeout=self.timeout)
+        r.raise_for_status()
 
-            soup = BeautifulSoup(r.text, "html.parser")
+        return await extract(r.text, self._parse_search)
 
+    def _parse_search(self, doc):
         results = []
-        cards = soup.select(".manga-card")
 
-        for card in cards:
+        for card in doc.select(".manga-card"):
             title = card.select_one("h3")
             link = card.select_one("a")
 
-            if title and link:
+            if title and link and link.attr("href"):
                 results.append({
-                    "title": title.text.strip(),
-                    "url": link["href"]
+                    "title": title.text(),
+                    "url": link.attr("href")
                 })
 
         return results
 
     # ================= CHAPTERS =================
     async def chapters(self, manga_url: str):
-        async with httpx.AsyncClient(headers=self.headers, timeout=self.timeout) as client:
-            r = await client.get(manga_url)
+        chapters, _ = await self.chapters_conditional(manga_url)
+        return chapters
+
+    async def chapters_conditional(self, manga_url: str, validators=None):
+        headers = {**self.headers, **conditional_headers(validators)}
 
-            if r.status_code != 200:
-                return []
+        client = get_client(manga_url)
+        r = await client.get(manga_url, headers=headers, timeout=self.timeout)
 
-            soup = BeautifulSoup(r.text, "html.parser")
+        if r.status_code == 304:
+            return None, validators
+
+        if r.status_code != 200:
+            return [], None
+
+        chapters = await extract(r.text, self._parse_chapters)
+        return chapters, response_validators(r)
+
+    def _parse_chapters(self, doc):
+        # o título é o mesmo para todos os capítulos: busca uma vez só
+        heading = doc.select_one("h1.manga-title")
+        manga_title = heading.text() if heading else ""
 
         chapters = []
 
-        for ch in soup.select(".chapters-list .chapter-item"):
+        for ch in doc.select(".chapters-list .chapter-item"):
             link = ch.select_one(".chapter-link")
             number = ch.select_one(".chapter-number")
-            date = ch.select_one(".chapter-date")
 
-            if link:
+            if link and link.attr("href"):
                 chapters.append({
-                    "name": number.text.strip() if number else "Capítulo",
-                    "chapter_number": self._extract_number(number.text if number else "0"),
-                    "url": link["href"],
-                    "manga_title": soup.select_one("h1.manga-title").text.strip()
+                    "name": number.text() if number else "Capítulo",
+                    "chapter_number": self._extract_number(number.text() if number else "0"),
+                    "url": link.attr("href"),
+                    "manga_title": manga_title
                 })
 
         chapters.sort(key=lambda x: float(x.get("chapter_number") or 0), reverse=True)
@@ -76,18 +92,19 @@ class MangaLivreBlogSource:
 
     # ================= PAGES =================
     async def pages(self, chapter_url: str):
-        async with httpx.AsyncClient(headers=self.headers, timeout=self.timeout) as client:
-            r = await client.get(chapter_url)
+        client = get_client(chapter_url)
+        r = await client.get(chapter_url, headers=self.headers, timeout=self.timeout)
 
-            if r.status_code != 200:
-                return []
+        if r.status_code != 200:
+            return []
 
-            soup = BeautifulSoup(r.text, "html.parser")
+        return await extract(r.text, self._parse_pages)
 
+    def _parse_pages(self, doc):
         images = []
 
-        for img in soup.select(".chapter-image-container img"):
-            src = img.get("src")
+        for img in doc.select(".chapter-image-container img"):
+            src = img.attr("src")
             if src:
                 images.append(src)
 
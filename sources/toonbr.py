@@ -1,21 +1,22 @@
-import httpx
 import asyncio
 
+from utils.http import get_client, conditional_headers, response_validators, preconnect
+
 class ToonBrSource:
     name = "ToonBr"
     base_url = "https://beta.toonbr.com"
     api_url = "https://api.toonbr.com"
     cdn_url = "https://cdn2.toonbr.com"
 
+    async def warmup(self):
+        await asyncio.gather(preconnect(self.api_url), preconnect(self.cdn_url))
+
     async def search(self, query: str):
         url = f"{self.api_url}/api/manga?page=1&limit=20&search={query}"
-        async with httpx.AsyncClient(timeout=60) as client:
-            try:
-                r = await client.get(url)
-                r.raise_for_status()
-                data = r.json()
-            except Exception:
-                return []
+        # erros sobem para o circuit breaker da fonte
+        r = await get_client(self.api_url).get(url, timeout=60)
+        r.raise_for_status()
+        data = r.json()
 
         results = []
         for manga in data.get("data", []):
@@ -25,15 +26,34 @@ class ToonBrSource:
             })
         return results
 
+    async def catalog(self, page: int):
+        url = f"{self.api_url}/api/manga?page={page}&limit=100"
+        try:
+            r = await get_client(self.api_url).get(url, timeout=60)
+            r.raise_for_status()
+            data = r.json()
+        except Exception:
+            return []
+
+        return [
+            {"title": manga.get("title"), "url": manga.get("slug")}
+            for manga in data.get("data", [])
+        ]
+
     async def chapters(self, manga_slug: str):
+        chapters, _ = await self.chapters_conditional(manga_slug)
+        return chapters
+
+    async def chapters_conditional(self, manga_slug: str, validators=None):
         url = f"{self.api_url}/api/manga/{manga_slug}"
-        async with httpx.AsyncClient(timeout=60) as client:
-            try:
-                r = await client.get(url)
-                r.raise_for_status()
-                data = r.json()
-            except Exception:
-                return []
+        try:
+            r = await get_client(self.api_url).get(url, headers=conditional_headers(validators), timeout=60)
+            if r.status_code == 304:
+                return None, validators
+            r.raise_for_status()
+            data = r.json()
+        except Exception:
+            return [], None
 
         chapters = []
         manga_title = data.get("title", "Manga")
@@ -46,17 +66,16 @@ class ToonBrSource:
             })
 
         chapters.sort(key=lambda x: float(x.get("chapter_number") or 0), reverse=True)
-        return chapters
+        return chapters, response_validators(r)
 
     async def pages(self, chapter_id: str):
         url = f"{self.api_url}/api/chapter/{chapter_id}"
-        async with httpx.AsyncClient(timeout=60) as client:
-            try:
-                r = await client.get(url)
-                r.raise_for_status()
-                data = r.json()
-            except Exception:
-                return []
+        try:
+            r = await get_client(self.api_url).get(url, timeout=60)
+            r.raise_for_status()
+            data = r.json()
+        except Exception:
+            return []
 
         pages = []
         for p in data.get("pages", []):
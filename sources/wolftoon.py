@@ -1,49 +1,186 @@
 import asyncio
-import httpx
+import json
+import os
+import re
+import time
+
+from config import WOLFTOON_KEY_PATH
+from utils.http import get_client, preconnect
+from utils.text import normalize
 
 class WolftoonSource:
+    name = "Wolftoon"
+    # catalog() vem dos mais novos para os mais antigos (sincronização incremental)
+    catalog_ordered = True
+
     def __init__(self):
         self.base_url = "https://wolftoon.lovable.app"
         self.supabase_url = "https://encmakrlmutvsdzpodov.supabase.co"
         self.api_key = None
-        self.client = httpx.AsyncClient(timeout=30)
+        # chave salva em disco entre reinícios (None = só em memória)
+        self.key_path = WOLFTOON_KEY_PATH
+        self._key_lock = None
+        self.timeout = 30
+        # cópia enxuta de (id, title, synopsis), usada só se o filtro no servidor falhar
+        self.snapshot = None
+        self.snapshot_at = 0
+        self.snapshot_ttl = 3600
+
+    async def warmup(self):
+        await asyncio.gather(self.get_api_key(), preconnect(self.supabase_url))
+
+    async def get_api_key(self, rejected=None):
+        """
+        Chave anônima do Supabase: da memória, do disco ou, em último caso,
+        do bundle JS do site. rejected é a chave que acabou de levar 401 e
+        força buscar uma nova.
+        """
+        if self.api_key and self.api_key != rejected:
+            return self.api_key
+
+        if self._key_lock is None:
+            self._key_lock = asyncio.Lock()
 
-    async def get_api_key(self):
-        if self.api_key:
+        async with self._key_lock:
+            # outra chamada pode ter renovado enquanto esta esperava
+            if self.api_key and self.api_key != rejected:
+                return self.api_key
+
+            if rejected is None:
+                self.api_key = self._load_key()
+                if self.api_key:
+                    return self.api_key
+
+            self.api_key = await self._scrape_api_key()
+            self._save_key(self.api_key)
             return self.api_key
+
+    async def _scrape_api_key(self):
         # pegar script para extrair api_key
-        r = await self.client.get(self.base_url)
-        import re
+        r = await get_client(self.base_url).get(self.base_url, timeout=self.timeout)
         match = re.search(r'src=["\']?(/assets/index-[^"\'>]+\.js)["\']?', r.text)
         if not match:
             raise Exception("Script não encontrado")
         script_url = f"{self.base_url}{match.group(1)}"
-        script = await self.client.get(script_url)
+        script = await get_client(script_url).get(script_url, timeout=self.timeout)
         match_key = re.search(r'supabase\.co[\'"],\s*[a-zA-Z0-9_$]+\s*=\s*[\'"](eyJ[^\'"]+)', script.text)
         if not match_key:
             raise Exception("API Key não encontrada")
-        self.api_key = match_key.group(1)
-        return self.api_key
+        return match_key.group(1)
 
-    async def search(self, query):
+    def _load_key(self):
+        if not self.key_path:
+            return None
+        try:
+            with open(self.key_path) as f:
+                return json.load(f).get("api_key")
+        except (OSError, ValueError):
+            return None
+
+    def _save_key(self, api_key):
+        if not self.key_path:
+            return
+        try:
+            directory = os.path.dirname(self.key_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.key_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"api_key": api_key, "saved_at": time.time()}, f)
+            os.replace(tmp, self.key_path)
+        except OSError as e:
+            print("Erro ao salvar chave do Wolftoon:", e)
+
+    async def _rest(self, table, params):
         api_key = await self.get_api_key()
-        params = {"select": "*", "order": "rating.desc", "apikey": api_key}
-        r = await self.client.get(f"{self.supabase_url}/rest/v1/titles", params=params)
-        data = r.json()
+        url = f"{self.supabase_url}/rest/v1/{table}"
+        client = get_client(self.supabase_url)
+
+        r = await client.get(url, params={**params, "apikey": api_key}, timeout=self.timeout)
+        if r.status_code == 401:
+            # chave trocada no site: busca a nova e tenta de novo
+            api_key = await self.get_api_key(rejected=api_key)
+            r = await client.get(url, params={**params, "apikey": api_key}, timeout=self.timeout)
+        return r
+
+    async def search(self, query, limit=20, offset=0):
+        # filtro e paginação no PostgREST: só vêm as linhas que batem
+        term = self._ilike_term(query)
+        params = {
+            "select": "id,title",
+            "or": f"(title.ilike.{term},synopsis.ilike.{term})",
+            "order": "rating.desc",
+            "limit": limit,
+            "offset": offset,
+        }
+        try:
+            r = await self._rest("titles", params)
+            r.raise_for_status()
+            data = r.json()
+        except Exception as e:
+            print("Wolftoon search error:", e)
+            data = await self._search_snapshot(query, limit, offset)
         results = []
         for manga in data:
-            if query.lower() in manga["title"].lower() or query.lower() in manga.get("synopsis","").lower():
-                results.append({
-                    "title": manga["title"],
-                    "url": manga["id"],  # usar ID para buscar capítulos
-                    "manga_title": manga["title"]
-                })
+            results.append({
+                "title": manga["title"],
+                "url": manga["id"],  # usar ID para buscar capítulos
+                "manga_title": manga["title"]
+            })
         return results
 
+    def _ilike_term(self, query):
+        # valor entre aspas: vírgulas e parênteses não quebram o filtro or=(...)
+        query = query.replace("*", " ").strip()
+        query = query.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"*{query}*"'
+
+    async def _search_snapshot(self, query, limit, offset):
+        if self.snapshot is None or time.time() - self.snapshot_at > self.snapshot_ttl:
+            params = {"select": "id,title,synopsis", "order": "rating.desc"}
+            try:
+                r = await self._rest("titles", params)
+                r.raise_for_status()
+                self.snapshot = [
+                    (m["id"], m["title"], normalize(m["title"]), normalize(m.get("synopsis") or ""))
+                    for m in r.json()
+                ]
+                self.snapshot_at = time.time()
+            except Exception as e:
+                print("Wolftoon snapshot error:", e)
+                if self.snapshot is None:
+                    return []
+
+        q = normalize(query)
+        matches = [
+            {"id": manga_id, "title": title}
+            for manga_id, title, title_norm, synopsis_norm in self.snapshot
+            if q in title_norm or q in synopsis_norm
+        ]
+        return matches[offset:offset + limit]
+
+    async def catalog(self, page, page_size=1000):
+        # mais novos primeiro, para a sincronização incremental parar cedo
+        params = {
+            "select": "id,title",
+            "order": "created_at.desc",
+            "limit": page_size,
+            "offset": (page - 1) * page_size,
+        }
+        r = await self._rest("titles", params)
+        if r.status_code != 200:
+            return []
+        return [{"title": manga["title"], "url": manga["id"]} for manga in r.json()]
+
     async def chapters(self, manga_id):
-        api_key = await self.get_api_key()
-        params = {"select": "id,title_id,chapter_number,created_at", "title_id": f"eq.{manga_id}", "order": "chapter_number.desc", "apikey": api_key}
-        r = await self.client.get(f"{self.supabase_url}/rest/v1/chapters", params=params)
+        return await self.chapters_after(manga_id, None)
+
+    async def chapters_after(self, manga_id, chapter_number):
+        # com chapter_number, só os capítulos mais novos que ele
+        params = {"select": "id,chapter_number", "title_id": f"eq.{manga_id}", "order": "chapter_number.desc"}
+        if chapter_number is not None:
+            params["chapter_number"] = f"gt.{chapter_number}"
+        r = await self._rest("chapters", params)
         data = r.json()
         chapters = []
         for ch in data:
@@ -56,9 +193,8 @@ class WolftoonSource:
         return chapters
 
     async def pages(self, chapter_id):
-        api_key = await self.get_api_key()
-        params = {"select": "id,title_id,images", "id": f"eq.{chapter_id}", "apikey": api_key}
-        r = await self.client.get(f"{self.supabase_url}/rest/v1/chapters", params=params)
+        params = {"select": "images", "id": f"eq.{chapter_id}"}
+        r = await self._rest("chapters", params)
         data = r.json()
         if not data:
             return []
@@ -0,0 +1,27 @@
+# tests/test_cbz.py
+
+import asyncio
+import zipfile
+
+import pytest
+
+pytest.importorskip("httpx")
+
+
+def test_create_cbz_reports_missing_pages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    import utils.cbz as cbz
+
+    async def fetch_page(url, stats=None):
+        return None if url.endswith("404") else b"\xff\xd8\xff" + url.encode()
+
+    monkeypatch.setattr(cbz, "fetch_page", fetch_page)
+
+    urls = ["p1", "p2-404", "p3", "p4-404"]
+    missing = []
+    cbz_file, name = asyncio.run(cbz.create_cbz(urls, "Manga", "Cap_1", compact=False, missing=missing))
+
+    assert name == "Manga_Cap_1.cbz"
+    assert missing == [2, 4]
+    assert zipfile.ZipFile(cbz_file).namelist() == ["0001.jpg", "0003.jpg"]
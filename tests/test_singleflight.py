@@ -0,0 +1,47 @@
+# tests/test_singleflight.py
+
+import asyncio
+
+import pytest
+
+from utils.singleflight import SingleFlight, LeaderCancelled
+
+
+def test_followers_share_result():
+    async def run():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(3)))
+        return calls, results
+
+    calls, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert sorted(results) == [("ok", False), ("ok", True), ("ok", True)]
+
+
+def test_leader_cancel_is_a_failure_for_followers():
+    async def run():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(10)
+
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        with pytest.raises(LeaderCancelled):
+            await follower
+        return flight.in_flight()
+
+    assert asyncio.run(run()) == 0
@@ -0,0 +1,76 @@
+# tests/test_upload.py
+#
+# Envio de um CBZ pequeno (abaixo de CBZ_SPOOL_MAX_BYTES, que fica só na
+# memória) pelo caminho real do PTB, com a requisição HTTP interceptada.
+
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+pytest.importorskip("telegram")
+pytest.importorskip("httpx")
+pytest.importorskip("aiohttp")
+
+from telegram import Bot
+from telegram.request import BaseRequest
+
+
+class FakeRequest(BaseRequest):
+    def __init__(self):
+        self.uploads = []
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        if url.endswith("/getMe"):
+            result = {"id": 1, "is_bot": True, "first_name": "bot", "username": "bot"}
+        else:
+            self.uploads.append(request_data.multipart_data)
+            result = {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": 42, "type": "private"},
+                "document": {"file_id": "FILE", "file_unique_id": "U"},
+            }
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def test_upload_small_cbz(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    import main
+    from config import CBZ_SPOOL_MAX_BYTES
+    from utils.cbz import CbzWriter
+    from utils.job_queue import Job
+    from utils.outbound import outbound
+
+    writer = CbzWriter()
+    writer.add("0001", b"\xff\xd8\xff\xe0" + b"x" * 1000)
+    cbz_file = writer.finish()
+    assert cbz_file.seek(0, 2) < CBZ_SPOOL_MAX_BYTES
+    assert cbz_file.name is None  # ainda na memória
+
+    request = FakeRequest()
+    job = Job(1, 42, 7, "ToonBr", None, None, 1, {})
+
+    async def run():
+        async with Bot("123:abc", request=request) as bot:
+            try:
+                return await main.reply_document(bot, job, cbz_file, "Manga_Cap_1.cbz")
+            finally:
+                outbound.close()
+
+    sent = asyncio.run(run())
+
+    assert sent.document.file_id == "FILE"
+    [parts] = request.uploads
+    filename, content, _ = parts["document"]
+    assert filename == "Manga_Cap_1.cbz"
+    assert zipfile.ZipFile(io.BytesIO(content)).namelist() == ["0001.jpg"]
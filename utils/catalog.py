@@ -0,0 +1,250 @@
+# utils/catalog.py
+#
+# Catálogo local de títulos de todas as fontes, com busca tolerante a erros
+# de digitação e acentos (índice invertido de trigramas em memória,
+# persistido em SQLite).
+#
+# Fontes com método catalog(page) são sincronizadas periodicamente;
+# as demais entram no catálogo pelos resultados das buscas ao vivo. A
+# sincronização incremental (parar na primeira página sem novidades) só
+# vale para fontes com catalog_ordered = True, cuja listagem vem dos mais
+# novos para os mais antigos; as outras são sempre lidas por inteiro.
+#
+# Banco e índice são usados numa thread (asyncio.to_thread), com um lock:
+# carregar dezenas de milhares de títulos não trava o event loop.
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from config import (
+    CATALOG_DB_PATH,
+    CATALOG_SYNC_INTERVAL,
+    CATALOG_FULL_SYNC_INTERVAL,
+    CATALOG_MAX_PAGES,
+    CATALOG_MIN_SCORE,
+    CATALOG_MAX_RESULTS,
+)
+from utils.session_store import SearchResult
+from utils.text import normalize
+
+
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class Catalog:
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._entries = []  # id -> (source, url, title, norm, n_trigrams)
+        self._ids = {}  # (source, url) -> id
+        self._index = defaultdict(set)  # trigrama -> ids
+        self._synced = set()  # fontes com sincronização completa
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    # ================= BANCO =================
+    def _db(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS titles (
+                    source TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (source, url)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    source TEXT PRIMARY KEY,
+                    last_sync REAL NOT NULL,
+                    last_full_sync REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _load(self):
+        # chamado com o lock
+        if self._loaded:
+            return
+        db = self._db()
+        for source, url, title in db.execute("SELECT source, url, title FROM titles"):
+            self._index_entry(source, url, title)
+        self._synced = {source for (source,) in db.execute("SELECT source FROM sync_state")}
+        self._loaded = True
+
+    def _locked(self, func, *args):
+        with self._lock:
+            self._load()
+            return func(*args)
+
+    # ================= ÍNDICE =================
+    def _index_entry(self, source, url, title):
+        key = (source, url)
+        norm = normalize(title)
+        grams = trigrams(norm)
+        entry_id = self._ids.get(key)
+
+        if entry_id is not None:
+            old = self._entries[entry_id]
+            if old[2] == title:
+                return False
+            for gram in trigrams(old[3]):
+                self._index[gram].discard(entry_id)
+            self._entries[entry_id] = (source, url, title, norm, len(grams))
+        else:
+            entry_id = len(self._entries)
+            self._entries.append((source, url, title, norm, len(grams)))
+            self._ids[key] = entry_id
+
+        for gram in grams:
+            self._index[gram].add(entry_id)
+        return True
+
+    def _add(self, source, items):
+        """
+        items: [{"title": ..., "url": ...}]. Retorna quantos eram novos ou mudaram.
+        """
+        now = time.time()
+        rows = []
+
+        for item in items:
+            title, url = item.get("title"), item.get("url")
+            if not title or url is None:
+                continue
+            if self._index_entry(source, str(url), title):
+                rows.append((source, str(url), title, now))
+
+        if rows:
+            db = self._db()
+            db.executemany("INSERT OR REPLACE INTO titles VALUES (?, ?, ?, ?)", rows)
+            db.commit()
+
+        return len(rows)
+
+    async def add(self, source, items):
+        return await asyncio.to_thread(self._locked, self._add, source, items)
+
+    async def add_results(self, results):
+        by_source = defaultdict(list)
+        for r in results:
+            by_source[r.source].append({"title": r.title, "url": r.url})
+        for source, items in by_source.items():
+            await self.add(source, items)
+
+    # ================= BUSCA =================
+    async def search(self, query, limit=CATALOG_MAX_RESULTS):
+        return await asyncio.to_thread(self._locked, self._search, query, limit)
+
+    def _search(self, query, limit):
+        norm = normalize(query)
+        grams = trigrams(norm)
+        if not grams:
+            return []
+
+        shared = defaultdict(int)
+        for gram in grams:
+            for entry_id in self._index.get(gram, ()):
+                shared[entry_id] += 1
+
+        scored = []
+        for entry_id, count in shared.items():
+            source, url, title, title_norm, n_grams = self._entries[entry_id]
+            coverage = 1.0 if norm in title_norm else count / len(grams)
+            if coverage < CATALOG_MIN_SCORE:
+                continue
+            # entre títulos com a mesma cobertura, o mais parecido (mais curto) vem antes
+            jaccard = count / (len(grams) + n_grams - count)
+            scored.append((coverage + 0.25 * jaccard, entry_id))
+
+        scored.sort(reverse=True)
+
+        results = []
+        for _, entry_id in scored[:limit]:
+            source, url, title, _, _ = self._entries[entry_id]
+            results.append(SearchResult(source, title, url))
+        return results
+
+    # ================= SINCRONIZAÇÃO =================
+    def is_synced(self, source):
+        # vale depois de load() (search já carrega)
+        return source in self._synced
+
+    def _last_full_sync(self, name):
+        row = self._db().execute(
+            "SELECT last_full_sync FROM sync_state WHERE source = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _save_sync(self, name, now, last_full_sync):
+        db = self._db()
+        db.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)", (name, now, last_full_sync))
+        db.commit()
+        self._synced.add(name)
+
+    async def sync_source(self, name, source):
+        if not hasattr(source, "catalog"):
+            return
+
+        last_full = await asyncio.to_thread(self._locked, self._last_full_sync, name)
+        # listagem sem ordem: sem como saber onde param as novidades
+        full = (
+            not getattr(source, "catalog_ordered", False)
+            or last_full is None
+            or time.time() - last_full > CATALOG_FULL_SYNC_INTERVAL
+        )
+
+        added = 0
+        for page in range(1, CATALOG_MAX_PAGES + 1):
+            items = await source.catalog(page)
+            if not items:
+                break
+
+            new = await self.add(name, items)
+            added += new
+
+            # incremental: a primeira página sem novidades encerra
+            if not full and not new:
+                break
+
+        now = time.time()
+        await asyncio.to_thread(self._locked, self._save_sync, name, now, now if full else last_full)
+        print(f"Catálogo {name}: {added} títulos novos/atualizados")
+
+    async def sync_loop(self, sources):
+        while True:
+            for name, source in sources.items():
+                try:
+                    await self.sync_source(name, source)
+                except Exception as e:
+                    print(f"Erro ao sincronizar catálogo {name}:", e)
+            await asyncio.sleep(CATALOG_SYNC_INTERVAL)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+catalog = Catalog(CATALOG_DB_PATH)
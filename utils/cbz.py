@@ -1,41 +1,261 @@
 import zipfile
-import httpx
 import asyncio
-from io import BytesIO
+import tempfile
+import time
+from collections import deque
+
+from config import CBZ_DOWNLOAD_WINDOW, CBZ_SPOOL_MAX_BYTES, COMPACT_IMAGES, IMAGE_RETRIES
+from utils.http import get_client
+from utils.image_cache import image_cache
+from utils.limiter import get_limiter, parse_retry_after, backoff_delay, is_retryable_status
+from utils.metrics import (
+    STAGE_SECONDS,
+    IMAGE_DOWNLOAD_SECONDS,
+    IMAGE_DOWNLOAD_BYTES,
+    IMAGE_DOWNLOAD_ERRORS,
+    CACHE_HITS,
+    CACHE_MISSES,
+)
+from utils.transcode import TranscodeStats, compact_image, PIL_AVAILABLE
+
+# formatos já comprimidos: DEFLATE só gasta CPU
+COMPRESSED_FORMATS = {"jpg", "png", "webp", "gif", "avif"}
 
 
 async def download_image(client, url):
+    cached = await image_cache.get(url)
+    if cached:
+        CACHE_HITS.inc(cache="image")
+        return cached
+    CACHE_MISSES.inc(cache="image")
+
+    limiter = get_limiter(url)
+    host = limiter.host
+    error = None
+
+    for attempt in range(IMAGE_RETRIES + 1):
+        retry_after = None
+
+        await limiter.acquire()
+        start = time.perf_counter()
+        try:
+            r = await client.get(url, timeout=60)
+        except Exception as e:
+            limiter.release(ok=False)
+            IMAGE_DOWNLOAD_ERRORS.inc(host=host)
+            error = e
+        else:
+            if is_retryable_status(r.status_code):
+                retry_after = parse_retry_after(r.headers.get("Retry-After"))
+                limiter.release(ok=False, retry_after=retry_after)
+                IMAGE_DOWNLOAD_ERRORS.inc(host=host)
+                error = f"HTTP {r.status_code}"
+            else:
+                limiter.release(ok=True)
+                if r.status_code != 200:
+                    IMAGE_DOWNLOAD_ERRORS.inc(host=host)
+                    print(f"Erro ao baixar imagem: HTTP {r.status_code} {url}")
+                    return None
+                IMAGE_DOWNLOAD_SECONDS.observe(time.perf_counter() - start, host=host)
+                IMAGE_DOWNLOAD_BYTES.inc(len(r.content), host=host)
+                await image_cache.put(url, r.content)
+                return r.content
+
+        if attempt < IMAGE_RETRIES:
+            await asyncio.sleep(retry_after or backoff_delay(attempt))
+
+    print(f"Erro ao baixar imagem: {error} {url}")
+    return None
+
+
+async def fetch_page(url, stats=None):
+    data = await download_image(get_client(url), url)
+    if data and stats is not None:
+        data = await compact_image(data, stats)
+    return data
+
+
+def sniff_image_type(data):
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if data[4:12] in (b"ftypavif", b"ftypavis"):
+        return "avif"
+    if data[:2] == b"BM":
+        return "bmp"
+    return "jpg"
+
+
+def write_page(cbz, name, data):
+    ext = sniff_image_type(data)
+    compress_type = zipfile.ZIP_STORED if ext in COMPRESSED_FORMATS else zipfile.ZIP_DEFLATED
+    cbz.writestr(f"{name}.{ext}", data, compress_type=compress_type)
+
+
+def safe_name(text):
+    return str(text).replace("/", "").replace(" ", "_")
+
+
+async def iter_pages(image_urls, stats=None):
+    """
+    Baixa no máximo CBZ_DOWNLOAD_WINDOW páginas à frente e entrega cada uma
+    assim que chega, na ordem, como (índice, bytes). Páginas que falharam
+    são puladas (o índice mostra o buraco).
+    """
+    urls = iter(image_urls)
+    pending = deque()
+    index = 0
+
+    def fill():
+        while len(pending) < CBZ_DOWNLOAD_WINDOW:
+            url = next(urls, None)
+            if url is None:
+                return
+            pending.append(asyncio.create_task(fetch_page(url, stats)))
+
     try:
-        r = await client.get(url, timeout=60)
-        r.raise_for_status()
-        return r.content
-    except Exception as e:
-        print(f"Erro ao baixar imagem: {e}")
-        return None
+        fill()
+        while pending:
+            img_bytes = await pending.popleft()
+            fill()
+            if img_bytes:
+                yield index, img_bytes
+            index += 1
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class CbzWriter:
+    """
+    Zip gravado direto num arquivo temporário: fica em memória só até
+    CBZ_SPOOL_MAX_BYTES, acima disso vai para disco.
+    """
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=CBZ_SPOOL_MAX_BYTES)
+        self.zip = zipfile.ZipFile(self.file, "w")
+        self.pages = 0
+        # tempo gasto montando o zip (sem os downloads)
+        self.seconds = 0.0
+
+    def size(self):
+        return self.file.tell()
 
+    def add(self, name, data):
+        start = time.perf_counter()
+        write_page(self.zip, name, data)
+        self.seconds += time.perf_counter() - start
+        self.pages += 1
 
-async def create_cbz(image_urls, manga_title, chapter_name):
-    safe_title = manga_title.replace("/", "").replace(" ", "_")
-    safe_chapter = str(chapter_name).replace("/", "").replace(" ", "_")
+    def finish(self):
+        start = time.perf_counter()
+        self.zip.close()
+        self.seconds += time.perf_counter() - start
+        STAGE_SECONDS.observe(self.seconds, stage="zip")
+        self.file.seek(0)
+        return self.file
 
-    cbz_filename = f"{safe_title}_{safe_chapter}.cbz"
+    def discard(self):
+        self.zip.close()
+        self.file.close()
 
-    async with httpx.AsyncClient() as client:
-        tasks = [download_image(client, url) for url in image_urls]
-        images = await asyncio.gather(*tasks)
 
-    images = [img for img in images if img]
+async def create_cbz(image_urls, manga_title, chapter_name, compact=COMPACT_IMAGES, missing=None):
+    """
+    missing: lista que recebe os números (a partir de 1) das páginas que
+    falharam mesmo depois das tentativas; o CBZ sai sem elas.
+    """
+    cbz_filename = f"{safe_name(manga_title)}_{safe_name(chapter_name)}.cbz"
 
-    if not images:
+    stats = TranscodeStats() if compact and PIL_AVAILABLE else None
+    writer = CbzWriter()
+    start = time.perf_counter()
+    expected = 0
+
+    try:
+        async for index, img_bytes in iter_pages(image_urls, stats):
+            if missing is not None:
+                missing.extend(range(expected + 1, index + 1))
+            expected = index + 1
+            writer.add(f"{index + 1:04d}", img_bytes)
+            del img_bytes
+    except BaseException:
+        writer.discard()
+        raise
+
+    if not writer.pages:
+        writer.discard()
         raise Exception("Nenhuma imagem foi baixada")
 
-    # ðŸ”¥ CRIA CBZ NA MEMÃ“RIA
-    cbz_buffer = BytesIO()
+    if missing is not None:
+        missing.extend(range(expected + 1, len(image_urls) + 1))
+
+    if stats is not None:
+        print(f"CBZ compacto {cbz_filename}: {stats}")
+
+    cbz_file = writer.finish()
+    STAGE_SECONDS.observe(time.perf_counter() - start, stage="cbz")
+    return cbz_file, cbz_filename
+
+
+async def create_volumes(chapters, manga_title, max_bytes, compact=COMPACT_IMAGES, missing=None):
+    """
+    Junta capítulos consecutivos em volumes CBZ, um diretório por capítulo.
+    chapters: async iterable de (chave, nome do diretório, urls das páginas,
+    primeira página), em ordem de leitura; só as páginas a partir da
+    primeira entram. Gera (arquivo, nome, retomada) de cada volume assim que
+    ele fecha: um volume é cortado antes da página que passaria de
+    max_bytes, e retomada é (chave, página) dessa página, ou None no último.
+    missing: dict que recebe, por chave, quantas páginas falharam.
+    """
+    stats = TranscodeStats() if compact and PIL_AVAILABLE else None
+    writer = None
+    first = last = None
+
+    def volume_name():
+        if first == last:
+            return f"{safe_name(manga_title)}_{safe_name(first)}.cbz"
+        return f"{safe_name(manga_title)}_{safe_name(first)}-{safe_name(last)}.cbz"
+
+    def count_missing(key, n):
+        if n and missing is not None:
+            missing[key] = missing.get(key, 0) + n
+
+    try:
+        async for key, folder, image_urls, start in chapters:
+            expected = start
+            async for index, img_bytes in iter_pages(image_urls[start:], stats):
+                page = start + index
+                count_missing(key, page - expected)
+                expected = page + 1
+
+                # reserva para cabeçalhos e o diretório central do zip
+                overhead = 128 * (writer.pages + 1) if writer else 128
+                if writer and writer.pages and writer.size() + len(img_bytes) + overhead > max_bytes:
+                    name = volume_name()
+                    cbz_file, writer = writer.finish(), None
+                    yield cbz_file, name, (key, page)
 
-    with zipfile.ZipFile(cbz_buffer, "w", compression=zipfile.ZIP_DEFLATED) as cbz:
-        for i, img_bytes in enumerate(images):
-            cbz.writestr(f"{i+1}.jpg", img_bytes)
+                if writer is None:
+                    writer = CbzWriter()
+                    first = folder
 
-    cbz_buffer.seek(0)
+                writer.add(f"{safe_name(folder)}/{page + 1:04d}", img_bytes)
+                last = folder
+                del img_bytes
+            count_missing(key, len(image_urls) - expected)
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
 
-    return cbz_buffer, cbz_filename
+    if writer is not None:
+        if stats is not None:
+            print(f"Volumes compactos {manga_title}: {stats}")
+        yield writer.finish(), volume_name(), None
@@ -0,0 +1,97 @@
+# utils/chapter_cache.py
+#
+# Cache das listas de capítulos por mangá. A lista em cache é devolvida na
+# hora; se passou de CHAPTER_CACHE_FRESH, uma atualização roda em segundo
+# plano, na forma mais barata que a fonte suportar:
+#   chapters_conditional(url, validators) -> ETag / If-Modified-Since (304)
+#   chapters_after(url, numero)           -> só capítulos mais novos
+#   chapters(url)                         -> lista completa
+
+import asyncio
+import time
+
+from config import CHAPTER_CACHE_FRESH
+from utils.metrics import SOURCE_SECONDS, SOURCE_ERRORS, CACHE_HITS, CACHE_MISSES, track
+from utils.session_store import CHAPTER_LISTS, CachedChapters, chapter_from_dict
+
+
+def _number(chapter):
+    try:
+        return float(chapter.number or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ChapterCache:
+    def __init__(self, store):
+        self.store = store
+        self._refreshing = {}
+
+    async def get(self, source_name, source, manga_url, title):
+        key = (source_name, manga_url)
+        entry = self.store.get(key)
+
+        if entry is None:
+            CACHE_MISSES.inc(cache="chapters")
+            entry = await self._fetch(source, manga_url, title, None)
+            # lista vazia costuma ser erro engolido pela fonte: não guarda
+            if entry.chapters:
+                self.store.set(key, entry)
+            return entry.chapters
+
+        CACHE_HITS.inc(cache="chapters")
+        if time.time() - entry.fetched_at > CHAPTER_CACHE_FRESH:
+            self._refresh(key, source, manga_url, title, entry)
+
+        return entry.chapters
+
+    def _refresh(self, key, source, manga_url, title, entry):
+        if key in self._refreshing:
+            return
+
+        async def run():
+            try:
+                fresh = await self._fetch(source, manga_url, title, entry)
+                # mesma regra do get(): lista vazia não substitui a que já temos
+                if fresh.chapters:
+                    self.store.set(key, fresh)
+            except Exception as e:
+                print("Erro ao atualizar capítulos:", e)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(run())
+
+    async def _fetch(self, source, manga_url, title, entry):
+        with track(SOURCE_SECONDS, SOURCE_ERRORS, source=source.name, op="chapters"):
+            return await self._download(source, manga_url, title, entry)
+
+    async def _download(self, source, manga_url, title, entry):
+        now = time.time()
+
+        if hasattr(source, "chapters_conditional"):
+            validators = entry.validators if entry else None
+            raw, validators = await source.chapters_conditional(manga_url, validators)
+            if raw is None:
+                # 304: nada mudou
+                return entry._replace(fetched_at=now)
+            chapters = tuple(chapter_from_dict(ch, title) for ch in raw)
+            return CachedChapters(chapters, validators, now)
+
+        if entry is not None and entry.chapters and hasattr(source, "chapters_after"):
+            highest = max(_number(ch) for ch in entry.chapters)
+            raw = await source.chapters_after(manga_url, highest)
+            if not raw:
+                return entry._replace(fetched_at=now)
+            newer = [chapter_from_dict(ch, title) for ch in raw]
+            known = {ch.url for ch in newer}
+            merged = newer + [ch for ch in entry.chapters if ch.url not in known]
+            merged.sort(key=_number, reverse=True)
+            return CachedChapters(tuple(merged), None, now)
+
+        raw = await source.chapters(manga_url)
+        chapters = tuple(chapter_from_dict(ch, title) for ch in raw)
+        return CachedChapters(chapters, None, now)
+
+
+chapter_cache = ChapterCache(CHAPTER_LISTS)
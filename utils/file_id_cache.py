@@ -0,0 +1,82 @@
+# utils/file_id_cache.py
+#
+# Índice persistente (fonte, capítulo) -> file_id do Telegram.
+# Um capítulo já enviado é reenviado pelo file_id, sem baixar nem zipar.
+
+import os
+import sqlite3
+import time
+
+from config import FILE_ID_CACHE_PATH, FILE_ID_TTL
+
+
+class FileIdCache:
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS file_ids (
+                    source TEXT NOT NULL,
+                    chapter TEXT NOT NULL,
+                    file_id TEXT NOT NULL,
+                    filename TEXT,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (source, chapter)
+                )
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, source, chapter):
+        row = self._db().execute(
+            "SELECT file_id, created_at FROM file_ids WHERE source = ? AND chapter = ?",
+            (source, str(chapter)),
+        ).fetchone()
+
+        if not row:
+            return None
+
+        file_id, created_at = row
+        if self.ttl and time.time() - created_at > self.ttl:
+            self.invalidate(source, chapter)
+            return None
+
+        return file_id
+
+    def put(self, source, chapter, file_id, filename=None):
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO file_ids VALUES (?, ?, ?, ?, ?)",
+            (source, str(chapter), file_id, filename, time.time()),
+        )
+        db.commit()
+
+    def invalidate(self, source, chapter=None):
+        db = self._db()
+        if chapter is None:
+            db.execute("DELETE FROM file_ids WHERE source = ?", (source,))
+        else:
+            db.execute(
+                "DELETE FROM file_ids WHERE source = ? AND chapter = ?",
+                (source, str(chapter)),
+            )
+        db.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+file_id_cache = FileIdCache(FILE_ID_CACHE_PATH, FILE_ID_TTL)
@@ -0,0 +1,164 @@
+# utils/health.py
+#
+# Saúde por fonte: circuit breaker + requisição "hedged".
+# Uma fonte que falha BREAKER_FAILURES vezes seguidas é pulada; depois de
+# BREAKER_COOLDOWN segundos uma sonda roda em segundo plano e, se der certo,
+# a fonte volta. Se a chamada passar do percentil HEDGE_PERCENTILE de
+# latência, uma segunda requisição igual é disparada e vale a primeira
+# que responder.
+
+import asyncio
+import time
+from collections import deque
+
+from config import (
+    SOURCE_TIMEOUT,
+    BREAKER_FAILURES,
+    BREAKER_COOLDOWN,
+    HEDGE_ENABLED,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+)
+from utils.metrics import SOURCE_SECONDS, SOURCE_ERRORS, track
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class SourceHealth:
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.latencies = deque(maxlen=200)
+        self._probe = None
+
+    # ================= ESTADO =================
+    def available(self):
+        return self.state == CLOSED
+
+    def record_success(self, latency):
+        self.latencies.append(latency)
+        self.failures = 0
+        if self.state != CLOSED:
+            print(f"Fonte {self.name} voltou")
+        self.state = CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= BREAKER_FAILURES:
+            if self.state != OPEN:
+                print(f"Fonte {self.name} desativada temporariamente")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def percentile(self, p):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[index]
+
+    def hedge_delay(self):
+        if not HEDGE_ENABLED or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return self.percentile(HEDGE_PERCENTILE)
+
+    # ================= SONDA =================
+    def maybe_probe(self, factory, op):
+        if self.state != OPEN or self._probe is not None:
+            return
+        if time.monotonic() - self.opened_at < BREAKER_COOLDOWN:
+            return
+
+        self.state = HALF_OPEN
+        self._probe = asyncio.create_task(self._run_probe(factory, op))
+
+    async def _run_probe(self, factory, op):
+        try:
+            await self._timed(factory, op)
+        except Exception:
+            self.record_failure()
+        finally:
+            self._probe = None
+
+    async def _timed(self, factory, op):
+        # falhas são contadas por quem chama: uma por chamada, não por perna
+        start = time.monotonic()
+        with track(SOURCE_SECONDS, SOURCE_ERRORS, source=self.name, op=op):
+            result = await asyncio.wait_for(factory(), SOURCE_TIMEOUT)
+        self.record_success(time.monotonic() - start)
+        return result
+
+    # ================= CHAMADA =================
+    async def call(self, factory, op="search"):
+        """
+        Executa factory() (uma função que cria a coroutine) respeitando o
+        circuit breaker. Levanta SourceUnavailable se a fonte estiver aberta.
+        op só rotula as métricas de latência e erro.
+        """
+        if not self.available():
+            self.maybe_probe(factory, op)
+            raise SourceUnavailable(self.name)
+
+        try:
+            return await self._hedged(factory, op)
+        except Exception:
+            self.record_failure()
+            raise
+
+    async def _hedged(self, factory, op):
+        delay = self.hedge_delay()
+        first = asyncio.create_task(self._timed(factory, op))
+
+        if delay is None:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        second = asyncio.create_task(self._timed(factory, op))
+        pending = {first, second}
+        error = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class SourceUnavailable(Exception):
+    pass
+
+
+_health = {}
+
+
+def get_health(name):
+    health = _health.get(name)
+    if health is None:
+        health = SourceHealth(name)
+        _health[name] = health
+    return health
+
+
+def health_report():
+    return {
+        name: {
+            "state": h.state,
+            "failures": h.failures,
+            "p50": h.percentile(50),
+            "p95": h.percentile(95),
+        }
+        for name, h in _health.items()
+    }
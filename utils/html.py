@@ -0,0 +1,146 @@
+# utils/html.py
+#
+# Extração de HTML com backend plugável. Usa o parser mais rápido que
+# estiver instalado (selectolax, lxml ou BeautifulSoup) atrás de uma API
+# mínima de seletores CSS, e roda parse + extração numa thread para que
+# páginas grandes não travem o event loop.
+
+import asyncio
+from functools import lru_cache
+
+from config import HTML_BACKEND
+
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+try:
+    import cssselect  # noqa: F401  (lxml precisa dele para seletores CSS)
+    from lxml import html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from bs4 import BeautifulSoup
+    BS4_AVAILABLE = True
+except ImportError:
+    BS4_AVAILABLE = False
+
+
+# ==========================================================
+# NÓS
+# ==========================================================
+
+class SelectolaxNode:
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, css):
+        return [SelectolaxNode(n) for n in self._node.css(css)]
+
+    def select_one(self, css):
+        node = self._node.css_first(css)
+        return SelectolaxNode(node) if node is not None else None
+
+    def text(self):
+        return self._node.text(deep=True).strip()
+
+    def attr(self, name):
+        return self._node.attributes.get(name)
+
+
+class LxmlNode:
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, css):
+        return [LxmlNode(n) for n in self._node.cssselect(css)]
+
+    def select_one(self, css):
+        found = self._node.cssselect(css)
+        return LxmlNode(found[0]) if found else None
+
+    def text(self):
+        return self._node.text_content().strip()
+
+    def attr(self, name):
+        return self._node.get(name)
+
+
+class SoupNode:
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, css):
+        return [SoupNode(n) for n in self._node.select(css)]
+
+    def select_one(self, css):
+        node = self._node.select_one(css)
+        return SoupNode(node) if node is not None else None
+
+    def text(self):
+        return self._node.get_text().strip()
+
+    def attr(self, name):
+        return self._node.get(name)
+
+
+# ==========================================================
+# BACKENDS
+# ==========================================================
+
+def _parse_selectolax(html):
+    return SelectolaxNode(HTMLParser(html).root)
+
+
+def _parse_lxml(html):
+    return LxmlNode(lxml_html.document_fromstring(html))
+
+
+def _parse_bs4(html):
+    return SoupNode(BeautifulSoup(html, "html.parser"))
+
+
+BACKENDS = {}
+if SELECTOLAX_AVAILABLE:
+    BACKENDS["selectolax"] = _parse_selectolax
+if LXML_AVAILABLE:
+    BACKENDS["lxml"] = _parse_lxml
+if BS4_AVAILABLE:
+    BACKENDS["bs4"] = _parse_bs4
+
+
+@lru_cache(maxsize=None)
+def default_backend():
+    if HTML_BACKEND in BACKENDS:
+        return HTML_BACKEND
+    if HTML_BACKEND != "auto":
+        print(f"Backend HTML '{HTML_BACKEND}' não instalado, usando o disponível")
+    for name in ("selectolax", "lxml", "bs4"):
+        if name in BACKENDS:
+            return name
+    raise RuntimeError("Nenhum parser HTML instalado (selectolax, lxml ou beautifulsoup4)")
+
+
+def parse(html, backend=None):
+    """
+    Faz o parse uma vez e devolve o nó raiz com select/select_one/text/attr.
+    """
+    return BACKENDS[backend or default_backend()](html)
+
+
+async def extract(html, extractor, backend=None):
+    """
+    Roda parse + extractor(doc) numa thread. O extractor deve devolver dados
+    simples (listas, dicts, strings), nunca nós do documento.
+    """
+    return await asyncio.to_thread(lambda: extractor(parse(html, backend)))
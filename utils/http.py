@@ -0,0 +1,111 @@
+# utils/http.py
+
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import (
+    HTTP2_ENABLED,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_TIMEOUT,
+    HTTP_HOST_LIMITS,
+)
+
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+# Um AsyncClient por host: cada um mantém seu próprio pool keep-alive
+_clients = {}
+
+
+def _host(url):
+    return urlsplit(url).netloc or url
+
+
+def _build_client(host, http2):
+    max_connections = HTTP_HOST_LIMITS.get(host, HTTP_MAX_CONNECTIONS)
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(HTTP_MAX_KEEPALIVE, max_connections),
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=httpx.Timeout(HTTP_TIMEOUT),
+        http2=http2,
+        follow_redirects=True,
+    )
+
+
+def get_client(url, http2=True):
+    """
+    Retorna o cliente compartilhado do host da URL.
+    O cliente pertence ao registro: quem pega emprestado não deve fechá-lo.
+    http2=False força HTTP/1.1 mesmo com HTTP2_ENABLED.
+    """
+    host = _host(url)
+    http2 = http2 and HTTP2_ENABLED and _HTTP2_AVAILABLE
+    key = (host, http2)
+    client = _clients.get(key)
+
+    if client is None or client.is_closed:
+        client = _build_client(host, http2)
+        _clients[key] = client
+
+    return client
+
+
+async def preconnect(url, http2=True):
+    """
+    Abre a conexão (TCP + TLS) com o host de url e deixa no pool do
+    cliente, para a primeira requisição de verdade não pagar o handshake.
+    """
+    try:
+        await get_client(url, http2=http2).head(url, timeout=10)
+    except Exception as e:
+        print(f"Erro ao pré-conectar em {_host(url)}:", e)
+
+
+async def close_all():
+    clients = list(_clients.values())
+    _clients.clear()
+
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            print("Erro ao fechar cliente HTTP:", e)
+
+
+# ==========================================================
+# REQUISIÇÕES CONDICIONAIS
+# ==========================================================
+
+def conditional_headers(validators):
+    """
+    validators = (etag, last_modified) de uma resposta anterior
+    """
+    headers = {}
+    if validators:
+        etag, last_modified = validators
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def response_validators(response):
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return None
+    return etag, last_modified
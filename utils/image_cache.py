@@ -0,0 +1,246 @@
+# utils/image_cache.py
+#
+# Cache de páginas em disco, endereçado por conteúdo:
+#   urls/<xx>/<sha256(url)>   -> contém o sha256 do corpo
+#   blobs/<xx>/<sha256(corpo)> -> bytes da imagem
+# Páginas repetidas (créditos, propagandas) viram um único blob.
+# O mtime do blob marca o último uso e serve para a evicção LRU; ao sair,
+# o blob leva junto as referências que apontam para ele. Cada referência
+# conta como um bloco do disco no orçamento.
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+
+from config import IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES
+
+# espaço que um arquivo de referência ocupa de fato no disco
+POINTER_BYTES = 4096
+
+
+class ImageCache:
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._blobs = None  # {digest: [size, atime]}, carregado sob demanda
+        self._urls = {}     # sha256(url) -> digest do blob
+        self._refs = {}     # digest do blob -> {sha256(url), ...}
+        self._total = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    # ================= CAMINHOS =================
+    def _path(self, kind, digest):
+        return os.path.join(self.root, kind, digest[:2], digest)
+
+    @staticmethod
+    def _digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def _write_atomic(self, path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    # ================= ÍNDICE =================
+    def _load_index(self):
+        if self._blobs is not None:
+            return
+
+        blobs = {}
+        total = 0
+
+        for path, name in self._walk("blobs"):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            blobs[name] = [st.st_size, st.st_mtime]
+            total += st.st_size
+
+        urls = {}
+        refs = {}
+        for path, name in self._walk("urls"):
+            try:
+                with open(path, "r") as f:
+                    digest = f.read().strip()
+            except OSError:
+                continue
+            if digest not in blobs:
+                # referência órfã de uma evicção antiga
+                self._unlink(path)
+                continue
+            urls[name] = digest
+            refs.setdefault(digest, set()).add(name)
+            total += POINTER_BYTES
+
+        self._blobs = blobs
+        self._urls = urls
+        self._refs = refs
+        self._total = total
+
+    def _walk(self, kind):
+        top = os.path.join(self.root, kind)
+        if not os.path.isdir(top):
+            return
+        for dirpath, _, filenames in os.walk(top):
+            for name in filenames:
+                if not name.startswith(".tmp-"):
+                    yield os.path.join(dirpath, name), name
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _link(self, key, digest):
+        old = self._urls.get(key)
+        if old == digest:
+            return
+        if old is None:
+            self._total += POINTER_BYTES
+        else:
+            self._refs.get(old, set()).discard(key)
+        self._urls[key] = digest
+        self._refs.setdefault(digest, set()).add(key)
+
+    def _unlink_ref(self, key):
+        digest = self._urls.pop(key, None)
+        if digest is None:
+            return
+        self._total -= POINTER_BYTES
+        keys = self._refs.get(digest)
+        if keys is not None:
+            keys.discard(key)
+
+    def _evict(self):
+        # libera até 90% do orçamento para não evictar a cada escrita
+        target = self.max_bytes * 0.9
+        if self._total <= self.max_bytes:
+            return
+
+        for digest, (size, _) in sorted(self._blobs.items(), key=lambda kv: kv[1][1]):
+            if self._total <= target:
+                break
+            self._unlink(self._path("blobs", digest))
+            del self._blobs[digest]
+            self._total -= size
+
+            for key in self._refs.pop(digest, ()):
+                self._unlink(self._path("urls", key))
+                del self._urls[key]
+                self._total -= POINTER_BYTES
+
+    # ================= SÍNCRONO =================
+    def _get(self, url):
+        key = self._digest(url.encode())
+        url_path = self._path("urls", key)
+
+        try:
+            with open(url_path, "r") as f:
+                digest = f.read().strip()
+        except OSError:
+            return None
+
+        blob_path = self._path("blobs", digest)
+
+        try:
+            with open(blob_path, "rb") as f:
+                data = f.read()
+            os.utime(blob_path)
+        except OSError:
+            # blob evictado: a referência ficou órfã
+            self._unlink(url_path)
+            with self._lock:
+                if self._blobs is not None:
+                    self._unlink_ref(key)
+            return None
+
+        with self._lock:
+            if self._blobs is not None and digest in self._blobs:
+                self._blobs[digest][1] = os.path.getmtime(blob_path)
+
+        return data
+
+    def _contains(self, url):
+        # só confere os arquivos: não lê o blob nem mexe no mtime (LRU)
+        try:
+            with open(self._path("urls", self._digest(url.encode())), "r") as f:
+                digest = f.read().strip()
+        except OSError:
+            return False
+        return os.path.exists(self._path("blobs", digest))
+
+    def _put(self, url, data):
+        digest = self._digest(data)
+        blob_path = self._path("blobs", digest)
+
+        with self._lock:
+            self._load_index()
+            known = digest in self._blobs
+
+        if known:
+            try:
+                os.utime(blob_path)
+            except OSError:
+                known = False
+
+        if not known:
+            self._write_atomic(blob_path, data)
+
+        key = self._digest(url.encode())
+        self._write_atomic(self._path("urls", key), digest.encode())
+
+        with self._lock:
+            if digest not in self._blobs:
+                self._total += len(data)
+            self._blobs[digest] = [len(data), os.path.getmtime(blob_path)]
+            self._link(key, digest)
+            self._evict()
+
+    # ================= ASYNC =================
+    async def get(self, url):
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._get, url)
+        except Exception as e:
+            print("Erro no cache de imagens:", e)
+            return None
+
+    async def contains(self, url):
+        if not self.enabled:
+            return False
+        try:
+            return await asyncio.to_thread(self._contains, url)
+        except Exception as e:
+            print("Erro no cache de imagens:", e)
+            return False
+
+    async def put(self, url, data):
+        if not self.enabled or not data:
+            return
+        try:
+            await asyncio.to_thread(self._put, url, data)
+        except Exception as e:
+            print("Erro no cache de imagens:", e)
+
+
+image_cache = ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
@@ -0,0 +1,534 @@
+# utils/job_queue.py
+#
+# Fila de downloads persistente em SQLite. Cada job é serializável
+# (chat, usuário, fonte, capítulo), sobrevive a reinícios e é processado
+# pelo menos uma vez: o worker "aluga" o job por JOB_LEASE_SECONDS e, se
+# morrer antes de confirmar, o job volta para a fila quando o aluguel vence.
+# Cada aluguel guarda o dono (JOB_QUEUE_OWNER): ao reiniciar, recover()
+# devolve na hora os aluguéis do próprio dono, sem esperar o vencimento, e
+# um job que já gastou JOB_MAX_ATTEMPTS tentativas falha em vez de voltar.
+# Enfileiramentos em lote e confirmações são gravados em uma transação só.
+# As escritas rodam numa thread (asyncio.to_thread), uma por vez: esperar o
+# lock do SQLite de outro processo não trava o event loop.
+#
+# A ordem não é FIFO: pedidos avulsos (PRIORITY_INTERACTIVE) passam na frente
+# de "Baixar tudo" (PRIORITY_BULK), os usuários são atendidos em rodízio e
+# cada um tem no máximo JOB_USER_MAX_IN_FLIGHT jobs em andamento.
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from config import (
+    JOB_QUEUE_PATH,
+    JOB_QUEUE_OWNER,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_USER_MAX_IN_FLIGHT,
+)
+from utils.metrics import QUEUE_WAIT_SECONDS, GaugeFunc
+from utils.session_store import Chapter
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+Job = namedtuple(
+    "Job",
+    "id chat_id user_id source chapter reply_to attempts payload",
+)
+
+# intervalo para gravar as confirmações acumuladas
+ACK_FLUSH_INTERVAL = 1.0
+
+
+class JobQueue:
+    def __init__(self, path, lease_seconds, max_attempts, user_max_in_flight, owner=None):
+        self.path = path
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.user_max_in_flight = user_max_in_flight
+        self._last_user = None
+        self._conn = None
+        self._reader = None
+        self._event = None
+        self._acks = []
+        self._acks_lock = threading.Lock()
+        # uma transação por vez na conexão compartilhada entre threads
+        self._write_lock = threading.Lock()
+        self._flusher = None
+        self._listeners = []
+
+    # ================= BANCO =================
+    def _db(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # isolation_level=None: as transações são controladas à mão
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    source TEXT NOT NULL,
+                    chapter_url TEXT NOT NULL,
+                    chapter_number TEXT,
+                    chapter_name TEXT,
+                    manga_title TEXT,
+                    reply_to INTEGER,
+                    payload TEXT,
+                    priority INTEGER NOT NULL DEFAULT 1,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_until REAL,
+                    owner TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    error TEXT
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "priority" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 1")
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_user ON jobs (state, user_id, priority, id)"
+            )
+            # histórico antigo não serve para nada
+            self._conn.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - 24 * 3600),
+            )
+        return self._conn
+
+    def _read_db(self):
+        """
+        Conexão só de leitura para depth/position/average_duration, que rodam
+        no event loop: no WAL a leitura não espera o lock de escrita, e uma
+        conexão separada não disputa o mutex com a thread que está esperando
+        o busy_timeout dentro de um BEGIN IMMEDIATE.
+        """
+        if self._reader is None:
+            if self._conn is None:
+                with self._write_lock:
+                    self._db()
+            self._reader = sqlite3.connect(
+                f"file:{os.path.abspath(self.path)}?mode=ro", uri=True, check_same_thread=False,
+            )
+        return self._reader
+
+    def add_listener(self, func):
+        """
+        func() é chamada sempre que entra ou volta um job na fila deste
+        processo (o pool usa para acordar os processos de worker).
+        """
+        self._listeners.append(func)
+
+    def wake(self):
+        if self._event is not None:
+            self._event.set()
+        for func in self._listeners:
+            func()
+
+    # ================= ENFILEIRAR =================
+    async def enqueue_many(self, jobs):
+        """
+        jobs: dicts com chat_id, user_id, source, chapter (Chapter) e,
+        opcionalmente, reply_to, payload e priority. Tudo numa transação só.
+        Retorna os ids criados.
+        """
+        ids = await asyncio.to_thread(self._enqueue_many, jobs)
+        self.wake()
+        return ids
+
+    async def enqueue(self, **job):
+        return (await self.enqueue_many([job]))[0]
+
+    def _enqueue_many(self, jobs):
+        now = time.time()
+        rows = [
+            (
+                job["chat_id"],
+                job["user_id"],
+                job["source"],
+                str(job["chapter"].url),
+                None if job["chapter"].number is None else str(job["chapter"].number),
+                job["chapter"].name,
+                job["chapter"].manga_title,
+                job.get("reply_to"),
+                json.dumps(job.get("payload") or {}),
+                job.get("priority", PRIORITY_BULK),
+                QUEUED,
+                now,
+            )
+            for job in jobs
+        ]
+
+        ids = []
+        with self._write_lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    cursor = db.execute(
+                        """
+                        INSERT INTO jobs (chat_id, user_id, source, chapter_url, chapter_number,
+                                          chapter_name, manga_title, reply_to, payload, priority,
+                                          state, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        row,
+                    )
+                    ids.append(cursor.lastrowid)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+        return ids
+
+    # ================= CONSUMIR =================
+    def _next_user(self, db, now):
+        waiting = db.execute(
+            """
+            SELECT user_id, MIN(priority)
+            FROM jobs
+            WHERE state = ? OR (state = ? AND lease_until < ?)
+            GROUP BY user_id
+            """,
+            (QUEUED, LEASED, now),
+        ).fetchall()
+
+        in_flight = dict(db.execute(
+            "SELECT user_id, COUNT(*) FROM jobs WHERE state = ? AND lease_until >= ? GROUP BY user_id",
+            (LEASED, now),
+        ).fetchall())
+
+        eligible = [
+            (priority, user_id)
+            for user_id, priority in waiting
+            if in_flight.get(user_id, 0) < self.user_max_in_flight
+        ]
+        if not eligible:
+            return None
+
+        # só disputam os usuários com a maior prioridade pendente
+        best = min(priority for priority, _ in eligible)
+        users = sorted(user_id for priority, user_id in eligible if priority == best)
+
+        # rodízio: o próximo usuário depois do último atendido
+        if self._last_user is not None:
+            for user_id in users:
+                if user_id > self._last_user:
+                    return user_id
+        return users[0]
+
+    def _lease(self):
+        # confirmações pendentes liberam vagas por usuário
+        self.flush()
+
+        now = time.time()
+        with self._write_lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    user_id = self._next_user(db, now)
+                    row = None
+
+                    if user_id is not None:
+                        row = db.execute(
+                            """
+                            SELECT id, chat_id, user_id, source, chapter_url, chapter_number,
+                                   chapter_name, manga_title, reply_to, attempts, payload, created_at
+                            FROM jobs
+                            WHERE user_id = ? AND (state = ? OR (state = ? AND lease_until < ?))
+                            ORDER BY priority, id
+                            LIMIT 1
+                            """,
+                            (user_id, QUEUED, LEASED, now),
+                        ).fetchone()
+
+                    if row is None:
+                        db.execute("COMMIT")
+                        return None
+
+                    if row[9] < self.max_attempts:
+                        break
+
+                    # aluguel vencido de um job que já esgotou as tentativas:
+                    # o worker morreu com ele todas as vezes
+                    db.execute(
+                        "UPDATE jobs SET state = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                        (FAILED, "aluguel vencido", now, row[0]),
+                    )
+                    print(f"Job {row[0]} falhou: aluguel vencido {row[9]} vezes")
+
+                self._last_user = user_id
+
+                db.execute(
+                    """
+                    UPDATE jobs
+                    SET state = ?, attempts = attempts + 1, lease_until = ?, started_at = ?, owner = ?
+                    WHERE id = ?
+                    """,
+                    (LEASED, now + self.lease_seconds, now, self.owner, row[0]),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+        job = self._job_from_row(row[:-1])
+        if job.attempts == 1:
+            QUEUE_WAIT_SECONDS.observe(now - row[-1])
+        return job
+
+    def recover(self):
+        """
+        Devolve para a fila os jobs ainda alugados por este dono: sobraram
+        de uma execução anterior que morreu sem confirmá-los. Chamar só na
+        inicialização, antes de qualquer worker deste dono começar.
+        """
+        with self._write_lock:
+            cursor = self._db().execute(
+                "UPDATE jobs SET state = ?, lease_until = NULL WHERE state = ? AND (owner = ? OR owner IS NULL)",
+                (QUEUED, LEASED, self.owner),
+            )
+        if cursor.rowcount:
+            print(f"Fila: {cursor.rowcount} jobs alugados antes do reinício voltaram para a fila")
+            self.wake()
+        return cursor.rowcount
+
+    @staticmethod
+    def _job_from_row(row):
+        (job_id, chat_id, user_id, source, url, number, name, title,
+         reply_to, attempts, payload) = row
+        return Job(
+            job_id,
+            chat_id,
+            user_id,
+            source,
+            Chapter(number, name or "", url, title or ""),
+            reply_to,
+            attempts + 1,
+            json.loads(payload or "{}"),
+        )
+
+    async def get(self, poll_interval=5.0):
+        if self._event is None:
+            self._event = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+        while True:
+            job = await asyncio.to_thread(self._lease)
+            if job is not None:
+                return job
+
+            # acorda ao enfileirar; o timeout cobre aluguéis vencidos e
+            # jobs colocados por outros processos
+            self._event.clear()
+            try:
+                await asyncio.wait_for(self._event.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # ================= JOBS LONGOS =================
+    # o aluguel ainda é deste worker se o job continua LEASED pelo mesmo dono
+    # e na mesma tentativa (cada novo aluguel soma 1 em attempts)
+    _MINE = "id = ? AND state = ? AND owner IS ? AND attempts = ?"
+
+    async def keep_leased(self, job):
+        """
+        Renova o aluguel enquanto o job roda (jobs de volume passam fácil
+        do JOB_LEASE_SECONDS). Rodar como task e cancelar ao terminar.
+        """
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await asyncio.to_thread(self._renew, job):
+                    print(f"Job {job.id}: aluguel perdido para outro worker")
+                    return
+            except Exception as e:
+                print("Erro ao renovar aluguel:", e)
+
+    def _renew(self, job):
+        with self._write_lock:
+            cursor = self._db().execute(
+                f"UPDATE jobs SET lease_until = ? WHERE {self._MINE}",
+                (time.time() + self.lease_seconds, job.id, LEASED, self.owner, job.attempts),
+            )
+        return cursor.rowcount > 0
+
+    async def requeue(self, job):
+        """
+        Devolve o job para a fila com o payload atual, como um job novo
+        (tentativas zeradas). Jobs de volume voltam assim depois de cada
+        volume, então o rodízio e os pedidos interativos passam na frente do
+        resto da série. Não confirmar o job depois disso.
+        """
+        return await asyncio.to_thread(self._requeue, job, json.dumps(job.payload))
+
+    def _requeue(self, job, payload):
+        with self._write_lock:
+            cursor = self._db().execute(
+                f"""
+                UPDATE jobs
+                SET state = ?, owner = NULL, lease_until = NULL, attempts = 0, payload = ?
+                WHERE {self._MINE}
+                """,
+                (QUEUED, payload, job.id, LEASED, self.owner, job.attempts),
+            )
+        self.wake()
+        return cursor.rowcount > 0
+
+    # ================= CONFIRMAR =================
+    def ack(self, job_id):
+        # gravado pelo _flush_loop ou antes do próximo aluguel
+        with self._acks_lock:
+            self._acks.append((DONE, None, time.time(), job_id))
+        # a vaga do usuário pode ter liberado um job que estava esperando
+        self.wake()
+
+    async def nack(self, job, error=None):
+        state = await asyncio.to_thread(self._nack, job, error)
+        if state == QUEUED:
+            self.wake()
+        return state
+
+    def _nack(self, job, error):
+        # sem mais tentativas: falha definitiva; senão volta para a fila
+        state = FAILED if job.attempts >= self.max_attempts else QUEUED
+        with self._write_lock:
+            self._db().execute(
+                "UPDATE jobs SET state = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                (state, str(error) if error else None, time.time(), job.id),
+            )
+        return state
+
+    def flush(self):
+        with self._acks_lock:
+            if not self._acks:
+                return
+            acks, self._acks = self._acks, []
+
+        with self._write_lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    "UPDATE jobs SET state = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                    acks,
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                with self._acks_lock:
+                    self._acks = acks + self._acks
+                raise
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(ACK_FLUSH_INTERVAL)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print("Erro ao gravar fila:", e)
+
+    # ================= ESTADO =================
+    def depth(self):
+        return self._read_db().execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = ?", (QUEUED,)
+        ).fetchone()[0]
+
+    def average_duration(self, default=30.0):
+        row = self._read_db().execute(
+            """
+            SELECT AVG(finished_at - started_at) FROM (
+                SELECT finished_at, started_at FROM jobs
+                WHERE state = ? AND started_at IS NOT NULL
+                ORDER BY finished_at DESC LIMIT 50
+            )
+            """,
+            (DONE,),
+        ).fetchone()
+        return row[0] or default
+
+    def position(self, job_id, concurrency=1):
+        """
+        Posição estimada do job na fila (1 = próximo) e ETA em segundos,
+        simulando o rodízio: cada outro usuário passa na frente com até
+        tantos jobs da mesma prioridade quanto os que este usuário tem
+        antes deste job.
+        """
+        db = self._read_db()
+        row = db.execute(
+            "SELECT user_id, priority, state FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None or row[2] != QUEUED:
+            return 0, 0.0
+
+        user_id, priority = row[0], row[1]
+
+        higher = db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = ? AND priority < ?",
+            (QUEUED, priority),
+        ).fetchone()[0]
+
+        rank = db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = ? AND user_id = ? AND priority = ? AND id <= ?",
+            (QUEUED, user_id, priority, job_id),
+        ).fetchone()[0]
+
+        others = db.execute(
+            """
+            SELECT COUNT(*) FROM jobs
+            WHERE state = ? AND priority = ? AND user_id != ?
+            GROUP BY user_id
+            """,
+            (QUEUED, priority, user_id),
+        ).fetchall()
+
+        position = higher + rank + sum(min(count, rank) for (count,) in others)
+        eta = position * self.average_duration() / max(1, concurrency)
+        return position, eta
+
+    def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._conn is not None:
+            try:
+                self.flush()
+            finally:
+                self._conn.close()
+                self._conn = None
+
+
+job_queue = JobQueue(
+    JOB_QUEUE_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_USER_MAX_IN_FLIGHT, JOB_QUEUE_OWNER,
+)
+
+GaugeFunc("queue_depth", "Jobs esperando na fila", job_queue.depth)
@@ -0,0 +1,131 @@
+# utils/limiter.py
+#
+# Limite adaptativo de requisições simultâneas por host (AIMD):
+# cada sucesso soma 1/limite (≈ +1 por "rodada"), cada 429/5xx/timeout
+# corta o limite pela metade e, se houver Retry-After, pausa o host.
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from config import (
+    HOST_CONCURRENCY_INITIAL,
+    HOST_CONCURRENCY_MIN,
+    HOST_CONCURRENCY_MAX,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+)
+
+
+class HostLimiter:
+    def __init__(self, host, initial, minimum, maximum):
+        self.host = host
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._waiters = []
+
+    async def acquire(self):
+        while True:
+            delay = self.blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # acordado e cancelado ao mesmo tempo: a vaga passa para o próximo
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def release(self, ok, retry_after=None):
+        self.in_flight -= 1
+
+        if ok:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(self.minimum, self.limit / 2)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+        self._wake()
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+_limiters = {}
+
+
+def get_limiter(url):
+    host = urlsplit(url).netloc or url
+    limiter = _limiters.get(host)
+
+    if limiter is None:
+        limiter = HostLimiter(
+            host,
+            HOST_CONCURRENCY_INITIAL,
+            HOST_CONCURRENCY_MIN,
+            HOST_CONCURRENCY_MAX,
+        )
+        _limiters[host] = limiter
+
+    return limiter
+
+
+def current_limits():
+    """
+    Retorna { host: (limite atual, requisições em andamento) }
+    """
+    return {
+        host: (int(limiter.limit), limiter.in_flight)
+        for host, limiter in _limiters.items()
+    }
+
+
+# ==========================================================
+# RETRY
+# ==========================================================
+
+def parse_retry_after(value):
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    # "full jitter": espalha as novas tentativas para não sincronizar
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+def is_retryable_status(status_code):
+    return status_code == 429 or status_code >= 500
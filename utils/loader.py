@@ -1,21 +1,99 @@
 # utils/loader.py
+#
+# Registro de fontes. A lista vem de SOURCES ("Nome=modulo:Classe,...") e do
+# entry point "mangabot.sources" de pacotes instalados. Cada fonte só é
+# importada e instanciada no primeiro uso; uma fonte que falha ao carregar é
+# deixada de fora sem derrubar as outras. warmup() roda no post_init.
 
-from sources.toonbr import ToonBrSource
-from sources.mangaflix import MangaFlixSource
-from sources.mangalivreblog import MangaLivreBlogSource
-from sources.wolftoon import WolftoonSource  # nova fonte
+import asyncio
+import importlib
+from importlib.metadata import entry_points
+
+from config import SOURCES, SOURCE_WARMUP_TIMEOUT
+
+ENTRY_POINT_GROUP = "mangabot.sources"
+
+_specs = None
+_sources = {}
+_failed = set()
+
+
+def _discover():
+    specs = {}
+
+    for item in SOURCES.split(","):
+        name, _, target = item.strip().partition("=")
+        if name and target:
+            specs[name.strip()] = target.strip()
+
+    try:
+        for entry in entry_points(group=ENTRY_POINT_GROUP):
+            specs.setdefault(entry.name, entry.value)
+    except Exception as e:
+        print("Erro ao ler entry points de fontes:", e)
+
+    return specs
+
+
+def source_names():
+    """
+    Nomes das fontes registradas, sem importar nenhuma.
+    """
+    global _specs
+    if _specs is None:
+        _specs = _discover()
+    return list(_specs)
+
+
+def get_source(name):
+    source = _sources.get(name)
+    if source is not None:
+        return source
+
+    if name in _failed or name not in source_names():
+        raise KeyError(name)
+
+    module_name, _, class_name = _specs[name].partition(":")
+    try:
+        source_class = getattr(importlib.import_module(module_name), class_name)
+        source = source_class()
+    except Exception as e:
+        print(f"Erro ao carregar a fonte {name}:", e)
+        _failed.add(name)
+        raise KeyError(name) from e
+
+    _sources[name] = source
+    return source
 
-# Dicionário de fontes disponíveis
-_sources = {
-    "ToonBr": ToonBrSource(),
-    "MangaFlix": MangaFlixSource(),
-    "MangaLivreBlog": MangaLivreBlogSource(),
-    "Wolftoon": WolftoonSource(),  # adicionada
-}
 
 def get_all_sources():
     """
     Retorna todas as fontes disponíveis no formato:
     { "NomeDaFonte": FonteClass() }
     """
-    return _sources
+    sources = {}
+    for name in source_names():
+        try:
+            sources[name] = get_source(name)
+        except KeyError:
+            pass
+    return sources
+
+
+async def warmup():
+    """
+    Carrega as fontes e roda o warmup() de cada uma (conexões TLS, chaves
+    de API), em paralelo e com SOURCE_WARMUP_TIMEOUT por fonte.
+    """
+
+    async def run(name, source):
+        try:
+            await asyncio.wait_for(source.warmup(), SOURCE_WARMUP_TIMEOUT)
+        except Exception as e:
+            print(f"Aquecimento da fonte {name} falhou: {e!r}")
+
+    await asyncio.gather(*(
+        run(name, source)
+        for name, source in get_all_sources().items()
+        if hasattr(source, "warmup")
+    ))
@@ -0,0 +1,248 @@
+# utils/metrics.py
+#
+# Métricas no formato texto do Prometheus, sem dependências. Contadores e
+# histogramas são dicts indexados pela tupla de labels, então registrar uma
+# medida custa um lookup e uma soma. Gauges calculados na hora da coleta
+# (profundidade da fila, tamanho do pool) usam GaugeFunc.
+#
+# Processos de worker não têm endpoint próprio: mandam um snapshot das suas
+# métricas pelo canal de relatórios do pool e o processo do bot soma tudo
+# na exportação (ver REGISTRY.merge).
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+PREFIX = "mangabot_"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+WAIT_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self._remote = {}  # pid -> snapshot
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self):
+        return {m.name: m.snapshot() for m in self.metrics if m.kind != "gauge_func"}
+
+    def merge(self, pid, snapshot):
+        # os valores do processo são acumulados: o último snapshot substitui o anterior
+        self._remote[pid] = snapshot
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            remotes = [snap.get(metric.name, {}) for snap in self._remote.values()]
+            lines.extend(metric.render(remotes))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labels)
+
+    def snapshot(self):
+        return dict(self._values)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def _merged(self, remotes):
+        merged = dict(self._values)
+        for values in remotes:
+            for key, value in values.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self, remotes):
+        lines = self._header()
+        for key, value in sorted(self._merged(remotes).items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+
+class GaugeFunc(Metric):
+    """
+    Gauge sem labels lido na hora da exportação.
+    """
+    kind = "gauge_func"
+
+    def __init__(self, name, help, func):
+        super().__init__(name, help)
+        self.func = func
+
+    def render(self, remotes):
+        try:
+            value = self.func()
+        except Exception as e:
+            print(f"Erro ao coletar {self.name}:", e)
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # contagem por faixa (não acumulada) + soma + total
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        return {key: [list(counts), total, count] for key, (counts, total, count) in self._values.items()}
+
+    def _merged(self, remotes):
+        merged = self.snapshot()
+        for values in remotes:
+            for key, (counts, total, count) in values.items():
+                entry = merged.setdefault(key, [[0] * len(counts), 0.0, 0])
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+        return merged
+
+    def render(self, remotes):
+        lines = self._header()
+        for key, (counts, total, count) in sorted(self._merged(remotes).items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+@contextmanager
+def track(histogram, errors, **labels):
+    """
+    Mede o bloco em `histogram` e conta exceções em `errors`.
+    Cancelamentos não entram em nenhum dos dois.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errors.inc(**labels)
+        histogram.observe(time.perf_counter() - start, **labels)
+        raise
+    histogram.observe(time.perf_counter() - start, **labels)
+
+
+# ==========================================================
+# MÉTRICAS DO BOT
+# ==========================================================
+
+STAGE_SECONDS = Histogram(
+    "chapter_stage_seconds",
+    "Tempo de cada etapa do envio de um capítulo (pages, cbz, zip, upload)",
+    ("stage",),
+)
+
+IMAGE_DOWNLOAD_SECONDS = Histogram(
+    "image_download_seconds", "Tempo de download de uma imagem por host", ("host",),
+)
+IMAGE_DOWNLOAD_BYTES = Counter(
+    "image_download_bytes_total", "Bytes de imagem baixados por host", ("host",),
+)
+IMAGE_DOWNLOAD_ERRORS = Counter(
+    "image_download_errors_total", "Tentativas de download de imagem que falharam", ("host",),
+)
+
+SOURCE_SECONDS = Histogram(
+    "source_request_seconds", "Latência das chamadas às fontes", ("source", "op"),
+)
+SOURCE_ERRORS = Counter(
+    "source_errors_total", "Chamadas às fontes que falharam", ("source", "op"),
+)
+
+QUEUE_WAIT_SECONDS = Histogram(
+    "queue_wait_seconds", "Espera entre enfileirar e começar um job", buckets=WAIT_BUCKETS,
+)
+JOB_SECONDS = Histogram(
+    "job_seconds", "Duração dos jobs de envio", ("result",),
+)
+SENT_BYTES = Counter(
+    "sent_bytes_total", "Bytes de CBZ enviados ao Telegram",
+)
+
+CACHE_HITS = Counter("cache_hits_total", "Acertos de cache", ("cache",))
+CACHE_MISSES = Counter("cache_misses_total", "Faltas de cache", ("cache",))
+
+PREFETCHED = Counter("prefetched_chapters_total", "Listas de páginas buscadas pelo prefetch")
+PREFETCH_USED = Counter(
+    "prefetch_used_total", "Listas de páginas do prefetch usadas depois num envio",
+)
+
+OUTBOUND_WAIT_SECONDS = Histogram(
+    "outbound_wait_seconds", "Espera das chamadas ao Telegram no agendador", ("priority",),
+)
+FLOOD_WAITS = Counter("flood_waits_total", "RetryAfter recebidos do Telegram")
@@ -0,0 +1,238 @@
+# utils/outbound.py
+#
+# Agendador de tudo que o bot manda para o Telegram. Respeita os limites de
+# flood com um token bucket global (TELEGRAM_GLOBAL_RATE por segundo) e um
+# por chat (TELEGRAM_CHAT_RATE/s em privado, TELEGRAM_GROUP_RATE/min em
+# grupos). Um RetryAfter bloqueia só o chat afetado e a chamada é refeita
+# sozinha. Respostas e edições (PRIORITY_REPLY) passam na frente de envio de
+# arquivos (PRIORITY_UPLOAD), e uma edição ainda na fila é substituída pela
+# mais nova da mesma mensagem.
+#
+# Os limites valem por processo: com WORKER_PROCESSES=1 cada processo de
+# worker tem o seu agendador.
+
+import asyncio
+import itertools
+import time
+
+from telegram.error import RetryAfter
+
+from config import (
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_GROUP_RATE,
+    TELEGRAM_BURST,
+    TELEGRAM_MAX_RETRIES,
+)
+from utils.metrics import OUTBOUND_WAIT_SECONDS, FLOOD_WAITS, GaugeFunc
+
+PRIORITY_REPLY = 0
+PRIORITY_UPLOAD = 1
+
+# buckets de chats parados são descartados acima disso
+MAX_CHAT_BUCKETS = 10000
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now):
+        self._refill(now)
+        ready = now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+        return max(ready, self.blocked_until)
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+
+class _Request:
+    __slots__ = ("priority", "seq", "chat_id", "factory", "futures", "coalesce", "retries", "queued_at")
+
+    def __init__(self, priority, seq, chat_id, factory, future, coalesce):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.factory = factory
+        self.futures = [future]
+        self.coalesce = coalesce
+        self.retries = 0
+        self.queued_at = time.monotonic()
+
+
+def retry_seconds(error):
+    retry_after = error.retry_after
+    if hasattr(retry_after, "total_seconds"):
+        retry_after = retry_after.total_seconds()
+    return float(retry_after)
+
+
+class OutboundScheduler:
+    def __init__(self):
+        self._global = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+        self._chats = {}
+        self._pending = []
+        self._edits = {}  # chave de coalescência -> pedido ainda na fila
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._task = None
+        self._running = set()
+
+    # ================= PEDIDOS =================
+    async def send(self, chat_id, factory, priority=PRIORITY_REPLY, coalesce=None):
+        """
+        factory: função que cria a coroutine da chamada à API (pode rodar
+        mais de uma vez, se vier RetryAfter). coalesce: chave que identifica
+        a mensagem editada; um pedido com a mesma chave ainda na fila é
+        substituído por este e os dois recebem o mesmo resultado.
+        """
+        future = asyncio.get_running_loop().create_future()
+
+        queued = self._edits.get(coalesce) if coalesce is not None else None
+        if queued is not None:
+            queued.factory = factory
+            queued.futures.append(future)
+            return await future
+
+        request = _Request(priority, next(self._seq), chat_id, factory, future, coalesce)
+        if coalesce is not None:
+            self._edits[coalesce] = request
+        self._pending.append(request)
+
+        self._start()
+        self._wakeup.set()
+        return await future
+
+    def _start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                now = time.monotonic()
+                self._chats = {k: b for k, b in self._chats.items() if not b.idle(now)}
+            # ids negativos são grupos e canais
+            rate = TELEGRAM_GROUP_RATE / 60 if chat_id < 0 else TELEGRAM_CHAT_RATE
+            bucket = self._chats[chat_id] = TokenBucket(rate, TELEGRAM_BURST)
+        return bucket
+
+    # ================= DESPACHO =================
+    def _next(self, now):
+        # o pedido mais prioritário entre os chats liberados
+        best = None
+        earliest = None
+
+        for request in self._pending:
+            ready = self._bucket(request.chat_id).ready_at(now)
+            if ready <= now:
+                if best is None or (request.priority, request.seq) < (best.priority, best.seq):
+                    best = request
+            elif earliest is None or ready < earliest:
+                earliest = ready
+
+        if best is not None:
+            return best, None
+        return None, (earliest - now if earliest is not None else None)
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            request, wait = self._next(now)
+
+            if request is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            global_ready = self._global.ready_at(now)
+            if global_ready > now:
+                # reavalia depois: pode chegar algo mais prioritário
+                await asyncio.sleep(global_ready - now)
+                continue
+
+            self._pending.remove(request)
+            if request.coalesce is not None and self._edits.get(request.coalesce) is request:
+                del self._edits[request.coalesce]
+
+            self._global.take(now)
+            self._bucket(request.chat_id).take(now)
+            OUTBOUND_WAIT_SECONDS.observe(now - request.queued_at, priority=str(request.priority))
+
+            task = asyncio.create_task(self._execute(request))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, request):
+        try:
+            result = await request.factory()
+        except RetryAfter as e:
+            delay = retry_seconds(e)
+            FLOOD_WAITS.inc()
+            bucket = self._bucket(request.chat_id)
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+
+            request.retries += 1
+            if request.retries <= TELEGRAM_MAX_RETRIES:
+                print(f"Flood control no chat {request.chat_id}: aguardando {delay:.1f}s")
+                self._requeue(request)
+                return
+            self._fail(request, e)
+        except Exception as e:
+            self._fail(request, e)
+        else:
+            for future in request.futures:
+                if not future.done():
+                    future.set_result(result)
+
+    def _requeue(self, request):
+        newer = self._edits.get(request.coalesce) if request.coalesce is not None else None
+        if newer is not None:
+            # já existe uma edição mais nova: ela vale pelas duas
+            newer.futures.extend(request.futures)
+            return
+
+        if request.coalesce is not None:
+            self._edits[request.coalesce] = request
+        self._pending.append(request)
+        self._wakeup.set()
+
+    @staticmethod
+    def _fail(request, error):
+        for future in request.futures:
+            if not future.done():
+                future.set_exception(error)
+
+    # ================= ESTADO =================
+    def pending(self):
+        return len(self._pending)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+outbound = OutboundScheduler()
+
+GaugeFunc("outbound_pending", "Chamadas ao Telegram esperando na fila", outbound.pending)
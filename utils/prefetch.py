@@ -0,0 +1,153 @@
+# utils/prefetch.py
+#
+# Prefetch especulativo dos próximos capítulos. Depois de enviar o
+# capítulo N (ou ao abrir a lista de capítulos), a lista de páginas dos
+# seguintes é buscada em segundo plano e, com PREFETCH_IMAGES, as imagens
+# vão para o cache em disco. Tudo em baixa prioridade: um job por vez, as
+# imagens só quando o host tem folga no limitador e tudo (listas de páginas
+# pelo custo estimado PREFETCH_PAGES_COST) dentro do orçamento
+# PREFETCH_BYTES_PER_HOUR.
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+from config import (
+    PREFETCH_AHEAD,
+    PREFETCH_TTL,
+    PREFETCH_MAX_ENTRIES,
+    PREFETCH_IMAGES,
+    PREFETCH_BYTES_PER_HOUR,
+    PREFETCH_PAGES_COST,
+)
+from utils.cbz import download_image
+from utils.http import get_client
+from utils.image_cache import image_cache
+from utils.limiter import get_limiter
+from utils.metrics import (
+    SOURCE_SECONDS,
+    SOURCE_ERRORS,
+    CACHE_HITS,
+    CACHE_MISSES,
+    PREFETCHED,
+    PREFETCH_USED,
+    GaugeFunc,
+    track,
+)
+
+
+class Prefetcher:
+    def __init__(self):
+        self._pages = OrderedDict()  # (fonte, url) -> (páginas, momento, prefetched)
+        self._queue = None
+        self._queued = set()
+        self._task = None
+        self._spent = deque()  # (momento, bytes) da última hora
+
+    # ================= PÁGINAS =================
+    async def get_pages(self, source_name, source, chapter_url):
+        key = (source_name, str(chapter_url))
+        entry = self._pages.pop(key, None)
+
+        if entry is not None and time.monotonic() - entry[1] < PREFETCH_TTL:
+            CACHE_HITS.inc(cache="pages")
+            if entry[2]:
+                PREFETCH_USED.inc()
+            return entry[0]
+
+        CACHE_MISSES.inc(cache="pages")
+        with track(SOURCE_SECONDS, SOURCE_ERRORS, source=source_name, op="pages"):
+            pages = await source.pages(chapter_url)
+        if pages:
+            self._store(key, pages, prefetched=False)
+        return pages
+
+    def _store(self, key, pages, prefetched):
+        self._pages[key] = (pages, time.monotonic(), prefetched)
+        self._pages.move_to_end(key)
+        while len(self._pages) > PREFETCH_MAX_ENTRIES:
+            self._pages.popitem(last=False)
+
+    # ================= AGENDAR =================
+    def schedule(self, source_name, source, chapters, images=PREFETCH_IMAGES, limit=PREFETCH_AHEAD):
+        """
+        chapters: os próximos capítulos, do mais provável para o menos.
+        Só os limit primeiros entram (None = todos).
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+        for chapter in list(chapters)[:limit]:
+            key = (source_name, str(chapter.url))
+            if key in self._pages or key in self._queued:
+                continue
+            self._queued.add(key)
+            self._queue.put_nowait((key, source, chapter.url, images))
+
+    async def _run(self):
+        while True:
+            key, source, chapter_url, images = await self._queue.get()
+            try:
+                await self._prefetch(key, source, chapter_url, images)
+            except Exception as e:
+                print("Erro no prefetch:", e)
+            finally:
+                self._queued.discard(key)
+
+    async def _prefetch(self, key, source, chapter_url, images):
+        entry = self._pages.get(key)
+        if entry is None:
+            if not self._within_budget():
+                return
+            self._spent.append((time.monotonic(), PREFETCH_PAGES_COST))
+            with track(SOURCE_SECONDS, SOURCE_ERRORS, source=key[0], op="pages"):
+                pages = await source.pages(chapter_url)
+            if not pages:
+                return
+            self._store(key, pages, prefetched=True)
+            PREFETCHED.inc()
+        else:
+            pages = entry[0]
+
+        if not images:
+            return
+
+        for url in pages:
+            if not self._within_budget():
+                return
+            limiter = get_limiter(url)
+            # prefetch só usa a folga do host: pedidos reais têm prioridade
+            while limiter.in_flight >= max(1, int(limiter.limit) // 2):
+                await asyncio.sleep(0.5)
+            if await image_cache.contains(url):
+                continue
+            data = await download_image(get_client(url), url)
+            if data:
+                self._spent.append((time.monotonic(), len(data)))
+
+    def _within_budget(self):
+        cutoff = time.monotonic() - 3600
+        while self._spent and self._spent[0][0] < cutoff:
+            self._spent.popleft()
+        return self.bytes_last_hour() < PREFETCH_BYTES_PER_HOUR
+
+    # ================= ESTADO =================
+    def queued(self):
+        return len(self._queued)
+
+    def bytes_last_hour(self):
+        return sum(n for _, n in self._spent)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+prefetcher = Prefetcher()
+
+GaugeFunc("prefetch_queued", "Capítulos esperando o prefetch", prefetcher.queued)
+GaugeFunc(
+    "prefetch_bytes_last_hour", "Bytes gastos pelo prefetch na última hora", prefetcher.bytes_last_hour,
+)
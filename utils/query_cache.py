@@ -0,0 +1,93 @@
+# utils/query_cache.py
+#
+# Cache dos resultados de source.search() por (fonte, consulta normalizada).
+# Dentro do TTL responde direto; entre o TTL e TTL + STALE responde com o
+# valor antigo e atualiza em segundo plano (stale-while-revalidate).
+# Diferente de RESULTS (utils/session_store.py), que guarda a lista já
+# renderizada de cada mensagem.
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from config import QUERY_CACHE_TTL, QUERY_CACHE_STALE, QUERY_CACHE_MAX_ENTRIES
+from utils.metrics import CACHE_HITS, CACHE_MISSES
+from utils.text import normalize
+
+
+class QueryCache:
+    def __init__(self, ttl, stale, max_entries):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (resultados, momento)
+        self._refreshing = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get_or_fetch(self, source_name, query, fetch):
+        key = (source_name, normalize(query))
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            results, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            self._entries.move_to_end(key)
+
+            if age < self.ttl:
+                self.hits += 1
+                CACHE_HITS.inc(cache="query")
+                return results
+
+            if age < self.ttl + self.stale:
+                self.stale_hits += 1
+                CACHE_HITS.inc(cache="query")
+                self._refresh(key, fetch)
+                return results
+
+            del self._entries[key]
+
+        self.misses += 1
+        CACHE_MISSES.inc(cache="query")
+        results = await fetch()
+        self._store(key, results)
+        return results
+
+    def _store(self, key, results):
+        # lista vazia costuma ser erro engolido pela fonte: não guarda
+        if not results:
+            return
+
+        self._entries[key] = (results, time.monotonic())
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _refresh(self, key, fetch):
+        if key in self._refreshing:
+            return
+
+        async def run():
+            try:
+                self._store(key, await fetch())
+            except Exception as e:
+                print("Erro ao atualizar cache de busca:", e)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(run())
+
+    def stats(self):
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / total if total else 0.0,
+        }
+
+
+query_cache = QueryCache(QUERY_CACHE_TTL, QUERY_CACHE_STALE, QUERY_CACHE_MAX_ENTRIES)
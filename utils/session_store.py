@@ -0,0 +1,215 @@
+# utils/session_store.py
+#
+# Armazena o estado de navegação (resultados de busca, listas de capítulos,
+# mangá escolhido por usuário) com LRU + TTL e limite de memória.
+# Os registros são tuplas (namedtuple) em vez de dicts, e as listas de
+# capítulos ficam guardadas uma vez por (fonte, mangá), compartilhadas entre
+# todos os usuários. Com SESSION_DB_PATH as entradas também vão para um
+# SQLite, e a paginação continua funcionando depois de reiniciar o bot.
+# A gravação é feita em lote por uma thread (SESSION_FLUSH_INTERVAL), fora
+# do event loop; a sessão do usuário vai sem a lista de capítulos, que volta
+# do cache de capítulos depois de um reinício.
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from config import (
+    SESSION_TTL,
+    SESSION_MAX_ENTRIES,
+    SESSION_MAX_RECORDS,
+    SESSION_DB_PATH,
+    SESSION_FLUSH_INTERVAL,
+    CHAPTER_CACHE_TTL,
+)
+
+SearchResult = namedtuple("SearchResult", "source title url")
+Chapter = namedtuple("Chapter", "number name url manga_title")
+# chapters aponta para a mesma tupla do cache (não é cópia): os índices dos
+# botões continuam válidos mesmo que a lista seja atualizada em segundo plano
+MangaSession = namedtuple("MangaSession", "source url title results_id chapters", defaults=(None,))
+# lista de capítulos + validadores HTTP (etag, last_modified) da última busca
+CachedChapters = namedtuple("CachedChapters", "chapters validators fetched_at")
+
+
+def chapter_from_dict(data, manga_title=""):
+    return Chapter(
+        data.get("chapter_number"),
+        data.get("name") or "",
+        data.get("url"),
+        data.get("manga_title") or manga_title,
+    )
+
+
+class _Backing:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self.conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+        self.conn.commit()
+
+        self._lock = threading.Lock()
+        self._pending = {}  # (namespace, key) -> (valor, expira_em)
+        self._wakeup = threading.Event()
+        threading.Thread(target=self._flush_loop, name="session-store", daemon=True).start()
+
+    def load(self, namespace, key):
+        with self._lock:
+            pending = self._pending.get((namespace, key))
+        if pending is not None:
+            return pending if pending[1] >= time.time() else None
+
+        row = self.conn.execute(
+            "SELECT value, expires_at FROM sessions WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def save(self, namespace, key, value, expires_at):
+        # só marca: a thread grava depois (várias edições da mesma chave viram uma)
+        with self._lock:
+            self._pending[(namespace, key)] = (value, expires_at)
+        self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        rows = [
+            (namespace, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at)
+            for (namespace, key), (value, expires_at) in pending.items()
+        ]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)", rows)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(SESSION_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print("Erro ao gravar sessões:", e)
+
+
+_backing = None
+
+
+def _get_backing():
+    global _backing
+    if _backing is None and SESSION_DB_PATH:
+        _backing = _Backing(SESSION_DB_PATH)
+    return _backing
+
+
+def flush():
+    # grava o que ainda está pendente (chamar ao encerrar o bot)
+    if _backing is not None:
+        _backing.flush()
+
+
+class SessionStore:
+    def __init__(self, namespace, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES,
+                 max_records=SESSION_MAX_RECORDS, weight=None, persist=None):
+        self.namespace = namespace
+        # persist(valor) -> o que vai para o SQLite (None = o próprio valor)
+        self.persist = persist
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_records = max_records
+        self._data = OrderedDict()  # key -> (valor, expira_em, peso)
+        self._records = 0
+        if weight is not None:
+            self._weight = weight
+
+    @staticmethod
+    def _weight(value):
+        return len(value) if isinstance(value, (list, tuple)) and not hasattr(value, "_fields") else 1
+
+    def get(self, key):
+        entry = self._data.get(key)
+
+        if entry is not None:
+            value, expires_at, _ = entry
+            if expires_at >= time.time():
+                self._data.move_to_end(key)
+                return value
+            self._drop(key)
+
+        backing = _get_backing()
+        if backing is None:
+            return None
+
+        loaded = backing.load(self.namespace, repr(key))
+        if loaded is None:
+            return None
+
+        value, expires_at = loaded
+        self._insert(key, value, expires_at)
+        return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        self._insert(key, value, expires_at)
+
+        backing = _get_backing()
+        if backing is not None:
+            stored = value if self.persist is None else self.persist(value)
+            backing.save(self.namespace, repr(key), stored, expires_at)
+
+    def _insert(self, key, value, expires_at):
+        if key in self._data:
+            self._drop(key)
+
+        weight = self._weight(value)
+        self._data[key] = (value, expires_at, weight)
+        self._records += weight
+
+        while len(self._data) > 1 and (
+            len(self._data) > self.max_entries or self._records > self.max_records
+        ):
+            oldest = next(iter(self._data))
+            self._drop(oldest)
+
+    def _drop(self, key):
+        _, _, weight = self._data.pop(key)
+        self._records -= weight
+
+    def __len__(self):
+        return len(self._data)
+
+
+# resultados renderizados por mensagem: message_id -> tuple[SearchResult]
+RESULTS = SessionStore("results")
+# listas de capítulos compartilhadas: (fonte, url do mangá) -> CachedChapters
+CHAPTER_LISTS = SessionStore(
+    "chapters",
+    ttl=CHAPTER_CACHE_TTL,
+    max_entries=1000,
+    weight=lambda entry: len(entry.chapters),
+)
+# mangá aberto por usuário: user_id -> MangaSession. No disco vai sem os
+# capítulos (uma cópia por usuário); current_manga() os busca no cache
+USER_SESSIONS = SessionStore("users", persist=lambda session: session._replace(chapters=None))
@@ -0,0 +1,47 @@
+# utils/singleflight.py
+#
+# Junta chamadas idênticas em andamento: a primeira executa, as demais
+# com a mesma chave esperam e recebem o mesmo resultado (ou exceção).
+# Se a primeira for cancelada, as outras recebem LeaderCancelled (uma falha
+# comum), e não o cancelamento, que não é delas.
+
+import asyncio
+
+
+class LeaderCancelled(Exception):
+    pass
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, factory):
+        """
+        Retorna (resultado, compartilhado). compartilhado=True quando o
+        resultado veio de outra chamada que já estava em andamento.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+
+        try:
+            result = await factory()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                e = LeaderCancelled()
+            future.set_exception(e)
+            # evita "exception was never retrieved" quando ninguém esperava
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+    def in_flight(self):
+        return len(self._calls)
@@ -0,0 +1,16 @@
+# utils/text.py
+
+import re
+import unicodedata
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """
+    Minúsculas, sem acentos e com espaços colapsados:
+    "  Ataque  dos Titãs " -> "ataque dos titas"
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SPACES.sub(" ", text.casefold()).strip()
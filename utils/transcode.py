@@ -0,0 +1,110 @@
+# utils/transcode.py
+#
+# Recodificação de páginas para o modo compacto. O trabalho pesado roda num
+# ProcessPoolExecutor para não travar o event loop do bot.
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from config import COMPACT_MAX_WIDTH, COMPACT_FORMAT, COMPACT_QUALITY, COMPACT_WORKERS
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+_pool = None
+
+
+class TranscodeStats:
+    __slots__ = ("pages", "bytes_in", "bytes_out")
+
+    def __init__(self):
+        self.pages = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def saved(self):
+        return self.bytes_in - self.bytes_out
+
+    def add(self, before, after):
+        self.pages += 1
+        self.bytes_in += before
+        self.bytes_out += after
+
+    def __str__(self):
+        ratio = (self.saved / self.bytes_in * 100) if self.bytes_in else 0
+        return (
+            f"{self.pages} páginas, {self.bytes_in // 1024} KB -> "
+            f"{self.bytes_out // 1024} KB ({ratio:.0f}% economizado)"
+        )
+
+
+def transcode_image(data, max_width, fmt, quality):
+    # roda no processo filho: precisa ser função de módulo (picklable)
+    img = Image.open(BytesIO(data))
+
+    if getattr(img, "is_animated", False):
+        return data
+
+    if img.width > max_width:
+        height = round(img.height * max_width / img.width)
+        img = img.resize((max_width, height), Image.LANCZOS)
+
+    if fmt == "jpeg" or fmt == "jpg":
+        fmt = "JPEG"
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    else:
+        fmt = "WEBP"
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    out = BytesIO()
+    img.save(out, format=fmt, quality=quality, optimize=True)
+    result = out.getvalue()
+
+    # nunca troca por algo maior que o original
+    return result if len(result) < len(data) else data
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=COMPACT_WORKERS)
+    return _pool
+
+
+async def compact_image(data, stats=None):
+    if not PIL_AVAILABLE:
+        return data
+
+    loop = asyncio.get_running_loop()
+
+    try:
+        result = await loop.run_in_executor(
+            _get_pool(),
+            transcode_image,
+            data,
+            COMPACT_MAX_WIDTH,
+            COMPACT_FORMAT,
+            COMPACT_QUALITY,
+        )
+    except Exception as e:
+        print("Erro ao compactar imagem:", e)
+        result = data
+
+    if stats is not None:
+        stats.add(len(data), len(result))
+
+    return result
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,72 @@
+# utils/web.py
+#
+# Servidor HTTP embutido do bot (aiohttp), no mesmo event loop:
+#   GET /metrics       -> métricas no formato do Prometheus
+#   GET /health        -> estado das fontes, limites por host e fila
+#   POST WEBHOOK_PATH  -> updates do Telegram, no modo webhook
+
+import hmac
+
+from aiohttp import web
+
+from utils.health import health_report
+from utils.job_queue import job_queue
+from utils.limiter import current_limits
+from utils.metrics import REGISTRY
+
+
+async def metrics(request):
+    return web.Response(
+        text=REGISTRY.render(),
+        content_type="text/plain",
+        charset="utf-8",
+        headers={"X-Content-Type-Options": "nosniff"},
+    )
+
+
+async def health(request):
+    return web.json_response({
+        "status": "ok",
+        "sources": health_report(),
+        "hosts": {host: {"limit": limit, "in_flight": in_flight}
+                  for host, (limit, in_flight) in current_limits().items()},
+        "queue_depth": job_queue.depth(),
+    })
+
+
+def add_webhook(app, path, secret, handle):
+    """
+    handle(data) recebe o JSON do update; a resposta sai assim que ele
+    retorna, então deve só enfileirar o update.
+    """
+
+    if not secret:
+        raise ValueError("webhook sem secret")
+
+    async def webhook(request):
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(token, secret):
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        await handle(data)
+        return web.Response()
+
+    app.router.add_post(path, webhook)
+
+
+def create_app():
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/health", health)
+    return app
+
+
+async def start_server(app, host, port):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"🌐 HTTP em {host}:{port}")
+    return runner
@@ -0,0 +1,318 @@
+# utils/worker_pool.py
+#
+# Pool de workers de download com tamanho ajustável.
+# Cada unidade é uma task no processo do bot ou, com WORKER_PROCESSES=1,
+# um processo separado com seu próprio event loop e Bot, consumindo a mesma
+# fila SQLite (os aluguéis da fila garantem que um job vai para um só
+# worker, inclusive em outras máquinas que compartilhem o arquivo da fila).
+# Os processos mandam um relatório de cada envio de volta para o bot, e a
+# cada METRICS_PUSH_INTERVAL um snapshot das suas métricas. Na volta, cada
+# processo tem um Event que o bot liga quando entra job na fila, para não
+# depender só do polling da fila.
+#
+# O autoajuste olha a fila, a carga de CPU e a vazão (bytes/s enviados):
+# cresce enquanto há fila, a CPU tem folga e a vazão melhora; encolhe com a
+# CPU saturada, quando crescer não aumentou a vazão (rede no limite) ou sem fila.
+# Um tamanho que não rendeu mais vazão fica bloqueado por
+# AUTOSCALE_HOLD_INTERVALS rodadas, para o pool não oscilar entre n e n+1.
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+
+from config import (
+    BOT_TOKEN,
+    DOWNLOAD_WORKERS,
+    WORKER_PROCESSES,
+    WORKER_PROCESS_CONCURRENCY,
+    WORKER_MIN,
+    WORKER_MAX,
+    WORKER_AUTOSCALE,
+    AUTOSCALE_INTERVAL,
+    AUTOSCALE_CPU_HIGH,
+    AUTOSCALE_HOLD_INTERVALS,
+    METRICS_PUSH_INTERVAL,
+)
+from utils.job_queue import job_queue
+from utils.metrics import REGISTRY, JOB_SECONDS, SENT_BYTES
+
+
+class WorkerState:
+    """
+    Estado compartilhado entre o pool e um worker: pedido de parada,
+    se está ocupado e para onde mandar o relatório de cada job.
+    """
+
+    def __init__(self, report=None):
+        self.stopping = False
+        self.busy = False
+        self._report = report
+
+    def report(self, job_id, seconds, nbytes, ok):
+        if self._report is not None:
+            self._report(job_id, seconds, nbytes, ok)
+
+
+# ==========================================================
+# PROCESSO FILHO
+# ==========================================================
+
+def _process_main(token, concurrency, reports, stop_event, wakeup):
+    asyncio.run(_process_loop(token, concurrency, reports, stop_event, wakeup))
+
+
+async def _process_loop(token, concurrency, reports, stop_event, wakeup):
+    from telegram import Bot
+
+    import main
+    from utils.http import close_all
+
+    def report(job_id, seconds, nbytes, ok):
+        if reports is not None:
+            reports.put((os.getpid(), job_id, seconds, nbytes, ok))
+
+    states = [WorkerState(report) for _ in range(concurrency)]
+
+    async with Bot(token) as bot:
+        tasks = [asyncio.create_task(main.worker(bot, state)) for state in states]
+
+        # parada pedida pelo pool: termina o job atual e sai
+        last_push = time.monotonic()
+        while not stop_event.is_set():
+            # job novo no bot: acorda os workers sem esperar o polling
+            if await asyncio.to_thread(wakeup.wait, 1.0):
+                wakeup.clear()
+                job_queue.wake()
+            if reports is not None and time.monotonic() - last_push >= METRICS_PUSH_INTERVAL:
+                reports.put(("metrics", os.getpid(), REGISTRY.snapshot()))
+                last_push = time.monotonic()
+
+        for state, task in zip(states, tasks):
+            state.stopping = True
+            if not state.busy:
+                task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    job_queue.close()
+    await close_all()
+
+
+# ==========================================================
+# POOL
+# ==========================================================
+
+class WorkerPool:
+    def __init__(self, worker, bot):
+        self.worker = worker
+        self.bot = bot
+        self.units = []  # (state, task) ou (processo, stop_event, wakeup)
+        self._draining = []  # processos parando, até serem recolhidos
+        self._ctx = multiprocessing.get_context("spawn")
+        self._reports = self._ctx.Queue() if WORKER_PROCESSES else None
+        self._tasks = []
+        self._window_jobs = 0
+        self._window_bytes = 0
+        self._last_throughput = None
+        self._last_action = 0
+        self._steps = 0
+        self._ceiling = None  # tamanho que não aumentou a vazão
+        self._hold_until = 0
+        if WORKER_PROCESSES:
+            job_queue.add_listener(self._notify)
+
+    # ================= TAMANHO =================
+    def size(self):
+        """
+        Jobs processados ao mesmo tempo.
+        """
+        per_unit = WORKER_PROCESS_CONCURRENCY if WORKER_PROCESSES else 1
+        return len(self.units) * per_unit
+
+    def _add_unit(self):
+        if WORKER_PROCESSES:
+            stop_event = self._ctx.Event()
+            wakeup = self._ctx.Event()
+            process = self._ctx.Process(
+                target=_process_main,
+                args=(BOT_TOKEN, WORKER_PROCESS_CONCURRENCY, self._reports, stop_event, wakeup),
+                # não-daemon: o modo compacto abre um pool de processos dentro dele
+                daemon=False,
+            )
+            process.start()
+            self.units.append((process, stop_event, wakeup))
+        else:
+            state = WorkerState(self._on_report)
+            task = asyncio.create_task(self.worker(self.bot, state))
+            self.units.append((state, task))
+
+    def _remove_unit(self):
+        if not self.units:
+            return
+
+        if WORKER_PROCESSES:
+            # termina o job atual e sai; o processo é recolhido em _reap()
+            process, stop_event, _ = self.units.pop()
+            stop_event.set()
+            self._draining.append(process)
+            return
+
+        # prefere encerrar uma task ociosa; a ocupada termina o job antes
+        index = next((i for i, (state, _) in enumerate(self.units) if not state.busy), -1)
+        state, task = self.units.pop(index)
+        state.stopping = True
+        if not state.busy:
+            task.cancel()
+
+    def _reap(self):
+        # join() de quem já saiu: sem isso o processo fica zumbi
+        for process in list(self._draining):
+            if not process.is_alive():
+                process.join()
+                self._draining.remove(process)
+
+    def _notify(self):
+        for _, _, wakeup in self.units:
+            wakeup.set()
+
+    def scale_to(self, n):
+        self._reap()
+        n = max(WORKER_MIN, min(WORKER_MAX, n))
+        while len(self.units) < n:
+            self._add_unit()
+        while len(self.units) > n:
+            self._remove_unit()
+
+    # ================= RELATÓRIOS =================
+    def _on_report(self, job_id, seconds, nbytes, ok):
+        self._window_jobs += 1
+        self._window_bytes += nbytes
+        JOB_SECONDS.observe(seconds, result="ok" if ok else "failed")
+        SENT_BYTES.inc(nbytes)
+
+    async def _read_reports(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # com timeout, para a thread não prender o encerramento
+                item = await loop.run_in_executor(None, self._reports.get, True, 1.0)
+            except queue.Empty:
+                self._reap()
+                continue
+            if item[0] == "metrics":
+                REGISTRY.merge(item[1], item[2])
+                continue
+            pid, job_id, seconds, nbytes, ok = item
+            self._on_report(job_id, seconds, nbytes, ok)
+            status = "enviado" if ok else "falhou"
+            print(f"Worker {pid}: job {job_id} {status} em {seconds:.1f}s ({nbytes // 1024} KB)")
+
+    # ================= AUTOAJUSTE =================
+    @staticmethod
+    def cpu_load():
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except OSError:
+            return 0.0
+
+    def _autoscale_step(self):
+        self._steps += 1
+        throughput = self._window_bytes / AUTOSCALE_INTERVAL
+        self._window_jobs = 0
+        self._window_bytes = 0
+
+        backlog = job_queue.depth()
+        load = self.cpu_load()
+        current = len(self.units)
+        target = current
+
+        if load > AUTOSCALE_CPU_HIGH:
+            target = current - 1
+        elif not backlog:
+            target = current - 1
+        elif (
+            self._last_action > 0
+            and self._last_throughput is not None
+            and throughput <= self._last_throughput * 1.05
+        ):
+            # crescer não aumentou a vazão: a rede (ou a fonte) é o limite
+            target = current - 1
+            self._ceiling = current
+            self._hold_until = self._steps + AUTOSCALE_HOLD_INTERVALS
+        elif self._ceiling is not None and current + 1 >= self._ceiling and self._steps < self._hold_until:
+            # fica onde está até passar o bloqueio
+            target = current
+        else:
+            target = current + 1
+
+        self._last_throughput = throughput
+        self._last_action = target - current
+        self.scale_to(target)
+
+        if len(self.units) != current:
+            print(
+                f"Workers: {current} -> {len(self.units)} "
+                f"(fila {backlog}, CPU {load:.2f}, {throughput / 1024:.0f} KB/s)"
+            )
+
+    async def _autoscale_loop(self):
+        while True:
+            await asyncio.sleep(AUTOSCALE_INTERVAL)
+            try:
+                self._autoscale_step()
+            except Exception as e:
+                print("Erro no autoajuste de workers:", e)
+
+    # ================= CICLO DE VIDA =================
+    def start(self):
+        self.scale_to(DOWNLOAD_WORKERS)
+        if self._reports is not None:
+            self._tasks.append(asyncio.create_task(self._read_reports()))
+        if WORKER_AUTOSCALE:
+            self._tasks.append(asyncio.create_task(self._autoscale_loop()))
+
+    async def stop(self, timeout=30):
+        for task in self._tasks:
+            task.cancel()
+
+        units, self.units = self.units, []
+
+        if WORKER_PROCESSES:
+            for _, stop_event, _ in units:
+                stop_event.set()
+            processes = [process for process, _, _ in units] + self._draining
+            self._draining = []
+            deadline = time.monotonic() + timeout
+            for process in processes:
+                await asyncio.to_thread(process.join, max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()
+                    await asyncio.to_thread(process.join, 5)
+            return
+
+        for state, task in units:
+            state.stopping = True
+            if not state.busy:
+                task.cancel()
+
+        tasks = [task for _, task in units]
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        # job longo (volume) não segura o encerramento: o aluguel vence ou é
+        # devolvido pelo recover() e o job continua do ponto salvo
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# worker avulso, para outra máquina que compartilhe o arquivo da fila:
+#   python -m utils.worker_pool
+if __name__ == "__main__":
+    job_queue.recover()
+    # sem bot para avisar: o wakeup nunca liga e vale o polling da fila
+    _process_main(
+        BOT_TOKEN, WORKER_PROCESS_CONCURRENCY, None, multiprocessing.Event(), multiprocessing.Event(),
+    )